@@ -0,0 +1,98 @@
+import re
+import hashlib
+import sqlite3
+from config import CACHE_DB, CODE_CACHE_MAX_ENTRIES
+
+# ==============================================================================
+# 📊 DATA DEPT: Cache of generated analysis code that actually ran
+# ==============================================================================
+# Keyed by (normalized request, column names + dtypes), so the same question
+# against a CSV with the same shape skips the code-generation LLM call.
+
+def init_code_cache():
+    """Creates the code cache table if it doesn't exist."""
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS code_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_key TEXT,
+            schema_key TEXT,
+            request TEXT,
+            columns TEXT,
+            code TEXT,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (request_key, schema_key)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def normalize_request(text):
+    return re.sub(r"\s+", " ", text.lower()).strip(" ?!.")
+
+def schema_key(dataset):
+    """Fingerprint of the column names, dtypes and analysis engine (not the data itself)."""
+    signature = "|".join(f"{c['name']}:{c['dtype']}" for c in dataset["columns"])
+    if dataset.get("engine", "memory") != "memory":
+        signature += f"|engine={dataset['engine']}"   # Out-of-core code uses a different API
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+def get_cached_code(request, dataset):
+    """Returns (entry_id, code) for a previously successful run, else None."""
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    c.execute('SELECT id, code FROM code_cache WHERE request_key = ? AND schema_key = ?',
+              (normalize_request(request), schema_key(dataset)))
+    row = c.fetchone()
+    if row:
+        c.execute('UPDATE code_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP WHERE id = ?', (row[0],))
+        conn.commit()
+    conn.close()
+    return row
+
+def store_code(request, dataset, code):
+    """Remembers code that executed without errors (never call this for failed runs)."""
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    c.execute('''
+        INSERT OR REPLACE INTO code_cache (request_key, schema_key, request, columns, code)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (normalize_request(request), schema_key(dataset), request,
+          ", ".join(col["name"] for col in dataset["columns"]), code))
+    c.execute('''
+        DELETE FROM code_cache WHERE id NOT IN (
+            SELECT id FROM code_cache ORDER BY last_used_at DESC, id DESC LIMIT ?
+        )
+    ''', (CODE_CACHE_MAX_ENTRIES,))
+    conn.commit()
+    conn.close()
+
+def list_cached_code(limit=50):
+    """Most recently used entries, for inspection in the UI."""
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    c.execute('''
+        SELECT id, request, columns, code, hits, last_used_at FROM code_cache
+        ORDER BY last_used_at DESC, id DESC LIMIT ?
+    ''', (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return [{"id": r[0], "request": r[1], "columns": r[2], "code": r[3], "hits": r[4], "last_used_at": r[5]}
+            for r in rows]
+
+def purge_code(entry_id=None):
+    """Deletes one entry, or the whole cache when no ID is given."""
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    if entry_id is None:
+        c.execute('DELETE FROM code_cache')
+    else:
+        c.execute('DELETE FROM code_cache WHERE id = ?', (entry_id,))
+    conn.commit()
+    conn.close()
+
+# Initialize immediately when imported
+init_code_cache()
@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+import inspect
 
 # ==============================================================================
 # 🛠️ CRITICAL WINDOWS DLL FIXES
@@ -28,28 +30,22 @@ os.environ["OLLAMA_NUM_GPU"] = "0"
 # 2. IMPORTS & DEPENDENCIES
 # ==============================================================================
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import StringIO
-from contextlib import redirect_stdout
-from litellm import completion
+from concurrent.futures import ThreadPoolExecutor
 
 # --- INTERNAL MODULES ---
 import ats          # HR Dept
 import voice        # The Ears
 import db           # 💾 THE MEMORY
 import ingest       # 🧠 THE BRAIN (Added this!)
-from config import CURRENT_CONFIG
-from router import route_query
-
-# --- VECTOR DATABASE ---
-try:
-    from langchain.vectorstores import Chroma
-    from langchain.embeddings import OllamaEmbeddings
-except ImportError:
-    from langchain_community.vectorstores import Chroma
-    from langchain_community.embeddings import OllamaEmbeddings
+import legal        # ⚖️ Legal Dept
+import jobs         # 🏗️ Background Workers
+import artifacts    # 🖼️ Chart Store
+import datasets     # 📊 Dataset Cache
+import analyst      # 📊 Data Dept
+import sandbox      # 🧪 Code Sandbox
+import llm          # 🚦 LLM Gateway
+from config import CURRENT_CONFIG, SPECULATIVE_RETRIEVAL
+from router import route_query, get_route_stats
 
 # ==============================================================================
 # 3. PAGE CONFIGURATION
@@ -88,6 +84,8 @@ else:
     if "current_session_id" not in st.session_state:
         st.session_state.current_session_id = None
 
+    HISTORY_PAGE_SIZE = 20
+
     # 2. Render Sidebar
     with st.sidebar:
         st.markdown("---")
@@ -100,25 +98,64 @@ else:
             
         st.markdown("---")
         
-        sessions = db.get_all_sessions()
+        # 🔎 Full-text search across every conversation
+        search_query = st.text_input("Search conversations", placeholder="🔎 Search inside conversations...", label_visibility="collapsed")
+        if search_query:
+            hits = db.search_messages(search_query, limit=10)
+            if not hits:
+                st.caption("No matching messages.")
+            for hit in hits:
+                if st.button(f"💬 {hit['title']}", key=f"hit_{hit['message_id']}", help=hit["snippet"], use_container_width=True):
+                    st.session_state.messages = db.load_messages(hit["session_id"])
+                    st.session_state.current_session_id = hit["session_id"]
+                    st.rerun()
+                st.caption(hit["snippet"])
+            st.markdown("---")
+        
+        # Only the current page is queried and rendered (keyset pagination)
+        if "history_cursors" not in st.session_state:
+            st.session_state.history_cursors = [None]
+        
+        title_filter = st.text_input("Filter case files", placeholder="🔎 Filter by title...", label_visibility="collapsed")
+        if title_filter != st.session_state.get("history_filter", ""):
+            st.session_state.history_filter = title_filter
+            st.session_state.history_cursors = [None]
+        
+        sessions, next_cursor = db.get_sessions_page(
+            limit=HISTORY_PAGE_SIZE,
+            before_id=st.session_state.history_cursors[-1],
+            title_filter=title_filter or None
+        )
         if not sessions:
             st.write("📭 No history found.")
         
-        for s_id, title, date in sessions:
+        for s_id, title, date, message_count in sessions:
             col1, col2 = st.columns([0.85, 0.15])
             with col1:
-                if st.button(f"📄 {title}", key=f"load_{s_id}", use_container_width=True):
+                if st.button(f"📄 {title} ({message_count})", key=f"load_{s_id}", use_container_width=True):
                     st.session_state.messages = db.load_messages(s_id)
                     st.session_state.current_session_id = s_id
                     st.rerun()
             with col2:
                 if st.button("🗑️", key=f"del_{s_id}"):
                     db.delete_session(s_id)
+                    # Chart files nobody references any more are garbage-collected
+                    artifacts.collect_garbage()
                     if st.session_state.current_session_id == s_id:
                         st.session_state.messages = []
                         st.session_state.current_session_id = None
                     st.toast(f"🗑️ Deleted: {title}")
                     st.rerun()
+        
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            if len(st.session_state.history_cursors) > 1 and st.button("◀ Newer", use_container_width=True):
+                st.session_state.history_cursors.pop()
+                st.rerun()
+        with next_col:
+            if next_cursor is not None and st.button("Older ▶", use_container_width=True):
+                st.session_state.history_cursors.append(next_cursor)
+                st.rerun()
 
         # ==========================================
         # 📂 UNIVERSAL UPLOAD PORTAL (LOOP FIXED)
@@ -129,8 +166,6 @@ else:
         # 1. Setup Folders
         if not os.path.exists("uploads"): os.makedirs("uploads")
         if not os.path.exists("data"): os.makedirs("data")
-            
-        DATA_PATH_CSV = "uploads/active_data.csv"
         
         # 2. Initialize State for Loop Prevention
         if "last_processed_file" not in st.session_state:
@@ -142,7 +177,6 @@ else:
             type=["csv", "pdf", "docx", "txt", "pptx"]
         )
         
-        df = None
         if uploaded_file:
             file_ext = uploaded_file.name.split(".")[-1].lower()
             
@@ -162,12 +196,9 @@ else:
                     with open(save_path, "wb") as f:
                         f.write(uploaded_file.getbuffer())
                     
-                    with st.spinner("Updating Brain..."):
-                        try:
-                            ingest.ingest()
-                            st.success("✅ Saved to Long-Term Memory!")
-                        except Exception as e:
-                            st.error(f"❌ Error: {e}")
+                    # Runs in the background; chat keeps working on the current index meanwhile
+                    st.session_state.ingest_job_id = jobs.submit_ingest([save_path])
+                    st.toast("🧠 Updating Brain in the background...")
 
             # === OPTION B: DATA ANALYSIS (THE FIX) ===
             elif "Data" in intent:
@@ -176,8 +207,11 @@ else:
                 else:
                     # 🛑 STOP THE LOOP: Check if we already did this!
                     if st.session_state.last_processed_file != uploaded_file.name:
-                        with open(DATA_PATH_CSV, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
+                        # Parsed & converted to a columnar cache once, not on every rerun
+                        with st.spinner("📊 Indexing dataset..."):
+                            datasets.activate(uploaded_file.name, uploaded_file.getbuffer())
+                        if CURRENT_CONFIG["allow_data_analysis"]:
+                            sandbox.warm(datasets.get_active())   # Workers parse it in the background
                         
                         # Mark this file as "Done" so we don't reload it next time
                         st.session_state.last_processed_file = uploaded_file.name
@@ -185,17 +219,60 @@ else:
                         st.toast("📊 Data loaded for Analyst!")
                         st.rerun()
 
-        # Load existing Analysis CSV if available
-        if os.path.exists(DATA_PATH_CSV):
+        # Live ingestion progress (refreshes itself without rerunning the whole page)
+        @st.fragment(run_every=2)
+        def render_ingest_progress():
+            for job in jobs.get_active_jobs():
+                progress = job["progress"]
+                files_total = progress.get("files_total") or 0
+                chunks_total = progress.get("chunks_total") or 0
+                st.caption(f"🧠 Ingest #{job['id']}: {job['status']} ({progress.get('stage', 'queued')})")
+                if files_total:
+                    st.progress(
+                        min(progress.get("chunks_done", 0) / chunks_total, 1.0) if chunks_total else 0.0,
+                        text=f"Files {progress.get('files_done', 0)}/{files_total} · Chunks {progress.get('chunks_done', 0)}/{chunks_total}"
+                    )
+                eta = jobs.estimate_eta(progress)
+                if eta is not None:
+                    st.caption(f"⏱️ About {int(eta)}s left")
+            
+            last_job_id = st.session_state.get("ingest_job_id")
+            if last_job_id:
+                last_job = jobs.get_job(last_job_id)
+                if last_job and last_job["status"] == "done":
+                    st.success("✅ Saved to Long-Term Memory!")
+                elif last_job and last_job["status"] == "failed":
+                    st.error(f"❌ Error: {last_job['error']}")
+        
+        render_ingest_progress()
+
+        # Show the active Analysis dataset (summary only; the data is loaded when needed)
+        active_dataset = datasets.get_active()
+        if active_dataset:
             st.markdown("---")
-            df = pd.read_csv(DATA_PATH_CSV)
-            st.caption(f"📊 Active Analysis Data: {len(df)} rows")
+            st.caption(f"📊 Active Analysis Data: {active_dataset['rows']} rows × {len(active_dataset['columns'])} columns")
+            if active_dataset["engine"] != "memory":
+                st.caption(f"🐘 Larger than memory: analysed out-of-core ({active_dataset['engine']})")
             
             if st.button("❌ Unload Data", use_container_width=True):
-                os.remove(DATA_PATH_CSV)
+                datasets.unload()
                 # Reset the memory so we can upload the same file again if needed
                 st.session_state.last_processed_file = None 
                 st.rerun()
+            
+            with st.expander("🧰 Saved Analyses (Code Cache)"):
+                entries = analyst.list_cached_code(limit=20)
+                if not entries:
+                    st.caption("Nothing cached yet.")
+                for entry in entries:
+                    st.markdown(f"**{entry['request']}** · {entry['hits']} reuses")
+                    st.code(entry["code"], language="python")
+                    if st.button("🗑️ Forget", key=f"code_{entry['id']}"):
+                        analyst.purge_code(entry["id"])
+                        st.rerun()
+                if entries and st.button("🧹 Purge all", use_container_width=True):
+                    analyst.purge_code()
+                    st.rerun()
 
     # ==========================================================================
     # 6. HELPER FUNCTIONS
@@ -206,77 +283,177 @@ else:
             st.error("❌ Error: 'vector_db' folder not found.")
             return None
         try:
-            ollama_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
-            embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url=ollama_url)
-            db_conn = Chroma(persist_directory="vector_db", embedding_function=embeddings)
-            return db_conn
+            # Shared across sessions; reopened only after ingest() writes new chunks
+            return ingest.get_vector_store()
         except Exception as e:
             st.error(f"❌ Database Error: {e}")
             return None
 
-    def ask_legal_agent(query):
-        legal_db = get_legal_db()
-        if not legal_db:
-            return "⚠️ Legal System Offline. Check terminal."
+    def stream_llm(model, prompt, error_label):
+        """Yields the model's answer token by token as Ollama generates it."""
         try:
-            results = legal_db.similarity_search(query, k=3)
-            context = "\n".join([doc.page_content for doc in results])
-            prompt = f"You are a Corporate Lawyer. Answer based ONLY on this context:\n{context}\nUser Question: {query}"
-            ollama_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
-            response = completion(
-                model=f"ollama/{CURRENT_CONFIG['manager_model']}", 
-                messages=[{"role": "user", "content": prompt}],
-                api_base=ollama_url,
-                options={"num_gpu": 0}
-            )
-            return response['choices'][0]['message']['content']
-        except Exception as e:
-            return f"❌ Legal Agent Crash: {e}"
+            yield from llm.stream_chat(model, [{"role": "user", "content": prompt}])
+        except llm.LLMError as e:
+            yield f"❌ {error_label}: {e}"
+
+    def tee_stream(stream, sink):
+        """Passes tokens through, keeping a copy so an interrupted answer can still be saved."""
+        for token in stream:
+            sink.append(token)
+            yield token
+
+    @st.cache_resource
+    def get_background_pool():
+        """Shared worker threads for speculative work (no st.* calls allowed inside)."""
+        return ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative")
 
-    def ask_data_agent(query, df):
+    def retrieve_legal_docs(query, k=3):
+        """Embeds the query and fetches the top-k chunks. Returns (docs, seconds taken)."""
+        started = time.perf_counter()
+        results = legal.retrieve(query, k=k)
+        return results, time.perf_counter() - started
+
+    def ask_legal_agent(query, results=None):
+        """Retrieves context (unless already fetched speculatively), then returns a token stream of the lawyer's answer."""
+        if results is None:
+            legal_db = get_legal_db()
+            if not legal_db:
+                return "⚠️ Legal System Offline. Check terminal."
+            try:
+                results = legal.retrieve(query, k=3)
+            except Exception as e:
+                return f"❌ Legal Agent Crash: {e}"
+        
+        # 💡 Same question, same documents -> reuse the stored answer
+        cached_answer = legal.lookup_answer(query, results)
+        if cached_answer is not None:
+            st.toast("💡 Answered from memory (cached)")
+            return cached_answer
+        
+        context = legal.pack_context(results)
+        prompt = f"You are a Corporate Lawyer. Answer based ONLY on this context:\n{context}\nUser Question: {query}"
+        stream = stream_llm(CURRENT_CONFIG['manager_model'], prompt, "Legal Agent Crash")
+        return legal.remember_answer(query, results, stream)
+
+    def ask_data_agent(query, dataset):
         if not CURRENT_CONFIG["allow_data_analysis"]:
             return "🔒 **RESTRICTED FEATURE:** Data Analysis is only available in the PRO version."
 
+        # dtypes come from the precomputed summary, no need to touch the data yet
+        schema = ", ".join(f"{c['name']}: {c['dtype']}" for c in dataset["columns"])
+
+        # 🐘 Too big for pandas -> tell the model which out-of-core API it has instead
+        engine = dataset.get("engine", "memory")
+        if engine == "duckdb":
+            data_api = f"""The data ({dataset['rows']} rows) is too large for memory and is NOT in a DataFrame.
+        Query it with DuckDB SQL on the table `data`: con.sql("SELECT ... FROM data ...").df() returns a pandas DataFrame.
+        Filter and aggregate (GROUP BY, COUNT, AVG...) in SQL; only pull small results into pandas."""
+        elif engine == "chunked":
+            data_api = f"""The data ({dataset['rows']} rows) is too large for memory and is NOT in a DataFrame.
+        iter_chunks(columns=None) yields it as pandas DataFrame chunks; pass only the columns you need.
+        Aggregate chunk by chunk (running sums/counts, partial groupbys); never concatenate all chunks."""
+        else:
+            data_api = f"DataFrame `df` has {dataset['rows']} rows."
+
         prompt = f"""
         You are a Python Data Analyst. 
-        DataFrame columns: {df.columns.tolist()}
+        {data_api}
+        Columns (name: dtype): {schema}
         User Request: {query}
         Write PYTHON code to solve this. 
-        - If plotting, save to 'exports/charts/chart.png'.
+        - If plotting, save with plt.savefig(CHART_PATH) (CHART_PATH is already defined).
         - If calculating, print the answer.
         - OUTPUT ONLY CODE.
         """
-        ollama_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
-
+        # ♻️ Same question on a same-shaped dataset -> reuse code that already worked
+        cached = analyst.get_cached_code(query, dataset)
         try:
-            response = completion(
-                model=f"ollama/{CURRENT_CONFIG['data_agent_model']}", 
-                messages=[{"role": "user", "content": prompt}],
-                api_base=ollama_url,
-                options={"num_gpu": 0} 
-            )
-            code = response['choices'][0]['message']['content'].replace("```python", "").replace("```", "").strip()
-            
-            output_buffer = StringIO()
-            chart_file = "exports/charts/chart.png"
-            if not os.path.exists("exports/charts"): os.makedirs("exports/charts")
-            if os.path.exists(chart_file): os.remove(chart_file)
+            if cached:
+                code = cached[1]
+                st.toast("♻️ Reusing saved analysis code")
+            else:
+                answer = llm.chat(CURRENT_CONFIG['data_agent_model'], [{"role": "user", "content": prompt}])
+                code = answer.replace("```python", "").replace("```", "").strip()
             
-            with redirect_stdout(output_buffer):
-                exec(code, {"df": df, "pd": pd, "plt": plt, "sns": sns})
-                    
-            result_text = output_buffer.getvalue()
-            if os.path.exists(chart_file):
-                return {"type": "image", "path": chart_file, "text": result_text}
-            return result_text
+            # 🧪 Runs in a prewarmed worker process with CPU/memory/time limits
+            result = sandbox.run(code, dataset)
+            if not result["ok"]:
+                raise RuntimeError(result["error"])
+
+            # Only code that ran cleanly is remembered
+            if not cached:
+                analyst.store_code(query, dataset, code)
+
+            if result["chart"]:
+                return {"type": "image", "artifact": artifacts.store_bytes(result["chart"]), "text": result["stdout"]}
+            return result["stdout"]
         except Exception as e:
+            if cached:
+                analyst.purge_code(cached[0])   # Stopped working: don't serve it again
             return f"❌ Data Logic Error: {e}"
 
+    @st.cache_data(max_entries=256)
+    def load_artifact(artifact_id, thumbnail=False):
+        # Artifacts are immutable (content-addressed), so the bytes can be cached forever
+        return artifacts.read_bytes(artifact_id, thumbnail)
+
+    def render_content(content, thumbnail=False):
+        """Draws a chat message: charts (artifact or legacy path) or plain text."""
+        if isinstance(content, dict) and content.get("type") == "image":
+            if content.get("artifact"):
+                image = load_artifact(content["artifact"], thumbnail)
+                if image is None:
+                    st.caption("🖼️ Chart no longer available.")
+                elif thumbnail:
+                    st.image(image)
+                    with st.expander("🔍 Full size"):
+                        st.image(load_artifact(content["artifact"]))
+                else:
+                    st.image(image)
+            elif content.get("path") and os.path.exists(content["path"]):
+                st.image(content["path"])   # Charts saved before the artifact store
+            else:
+                st.caption("🖼️ Chart no longer available.")
+            if content.get("text"): st.write(content["text"])
+        else:
+            st.write(content)
+
+    @st.cache_resource
+    def housekeeping():
+        """Runs once per server process."""
+        jobs.start()   # Resume ingest jobs left queued/running by the previous process
+        removed = artifacts.sweep_stray_charts()
+        if removed:
+            print(f"🧹 Removed {removed} stray temp chart files")
+        collected = artifacts.collect_garbage()   # Includes charts of turns that were never saved
+        if collected:
+            print(f"🧹 Removed {collected} unreferenced charts")
+        if CURRENT_CONFIG["allow_data_analysis"]:
+            # Workers import pandas/matplotlib and parse the active dataset now, not on the first question
+            sandbox.warm(datasets.get_active())
+        return True
+
+    housekeeping()
+
     # ==========================================================================
     # 7. LAYOUT & RENDERING
     # ==========================================================================
     
     st.markdown("### 💬 Central Command")
+
+    # Operator telemetry stays out of the chat, collapsed in the sidebar
+    with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+        route_stats = get_route_stats()
+        st.caption(f"🧭 Router: {route_stats['llm_calls_saved']}/{route_stats['total']} requests routed locally (no LLM call)")
+        gateway_stats = llm.get_metrics()
+        for model, stats in gateway_stats["models"].items():
+            st.caption(f"🚦 {model}: {stats['calls']} calls, {stats['avg_latency_s']:.1f}s avg "
+                       f"({stats['avg_queued_s']:.1f}s queued), {stats['prompt_tokens']} prompt / "
+                       f"{stats['output_tokens']} output tokens, {stats['errors']} errors")
+        st.caption(f"🔗 {gateway_stats['coalesced']} duplicate prompts served by in-flight requests")
+        cache_stats = legal.get_cache_stats()
+        for name, label in (("retrieval", "🗃️ Retrieval cache"), ("embeddings", "🧮 Query embedding cache")):
+            st.caption(f"{label}: {cache_stats[name]['hits']} hits / {cache_stats[name]['misses']} misses")
     
     chat_container = st.container()   
     voice_container = st.container() 
@@ -284,11 +461,7 @@ else:
     with chat_container:
         for msg in st.session_state.messages:
             with st.chat_message(msg["role"]):
-                if isinstance(msg["content"], dict) and msg["content"].get("type") == "image":
-                    st.image(msg["content"]["path"])
-                    if msg["content"]["text"]: st.write(msg["content"]["text"])
-                else:
-                    st.write(msg["content"])
+                render_content(msg["content"], thumbnail=True)
 
     with voice_container:
         voice_text = voice.record_voice_widget()
@@ -311,47 +484,66 @@ else:
             st.session_state.current_session_id = db.create_session(prompt)
 
         st.session_state.messages.append({"role": "user", "content": prompt})
-        db.save_message(st.session_state.current_session_id, "user", prompt)
         
         with chat_container:
             with st.chat_message("user"):
                 st.write(prompt)
 
-        with st.spinner("🤖 Routing request..."):
-            department = route_query(prompt)
-            response_content = ""
+        # Any click while the answer streams reruns the script from inside write_stream:
+        # the finally block still saves the question and whatever was generated so far
+        response_content = ""
+        streamed = []
+        completed = False
+        try:
+            with st.spinner("🤖 Routing request..."):
+                started = time.perf_counter()
             
-            if department == "legal":
-                st.toast("⚖️ Transferred to Legal Dept.")
-                response_content = ask_legal_agent(prompt)
+                # ⚡ Speculation: search the legal docs while the router is still thinking
+                speculative = None
+                if SPECULATIVE_RETRIEVAL:
+                    speculative = get_background_pool().submit(retrieve_legal_docs, prompt)
+            
+                department = route_query(prompt)
+                route_seconds = time.perf_counter() - started
+            
+                if department == "legal":
+                    st.toast("⚖️ Transferred to Legal Dept.")
+                    results = None
+                    if speculative:
+                        try:
+                            results, retrieval_seconds = speculative.result()
+                            saved = route_seconds + retrieval_seconds - (time.perf_counter() - started)
+                            print(f"⚡ Speculative retrieval saved {saved:.2f}s (route {route_seconds:.2f}s, retrieval {retrieval_seconds:.2f}s)")
+                        except Exception as e:
+                            print(f"⚠️ Speculative retrieval failed, retrying serially: {e}")
+                    response_content = ask_legal_agent(prompt, results)
                 
-            elif department == "data":
-                if df is not None:
-                    st.toast("📊 Transferred to Data Dept.")
-                    response_content = ask_data_agent(prompt, df)
+                elif department == "data":
+                    if active_dataset is not None:
+                        st.toast("📊 Transferred to Data Dept.")
+                        response_content = ask_data_agent(prompt, active_dataset)
+                    else:
+                        response_content = "⚠️ Please upload a CSV file to use the Data Agent."
+            
                 else:
-                    response_content = "⚠️ Please upload a CSV file to use the Data Agent."
+                    response_content = stream_llm(CURRENT_CONFIG['manager_model'], prompt, "General Chat Error")
             
-            else:
-                ollama_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
-                try:
-                    response = completion(
-                        model=f"ollama/{CURRENT_CONFIG['manager_model']}", 
-                        messages=[{"role": "user", "content": prompt}],
-                        api_base=ollama_url,
-                        options={"num_gpu": 0}
-                    )
-                    response_content = response['choices'][0]['message']['content']
-                except Exception as e:
-                    response_content = f"❌ General Chat Error: {e}"
+                if speculative and department != "legal":
+                    # Not a legal question: throw the speculative search away
+                    speculative.cancel()
 
-        st.session_state.messages.append({"role": "assistant", "content": response_content})
-        db.save_message(st.session_state.current_session_id, "assistant", response_content)
-        
-        with chat_container:
-            with st.chat_message("assistant"):
-                if isinstance(response_content, dict) and response_content.get("type") == "image":
-                    st.image(response_content["path"])
-                    if response_content["text"]: st.write(response_content["text"])
-                else:
-                    st.write(response_content)
\ No newline at end of file
+            # Streamed answers are rendered token by token; the full text is saved once finished
+            with chat_container:
+                with st.chat_message("assistant"):
+                    if inspect.isgenerator(response_content):
+                        response_content = st.write_stream(tee_stream(response_content, streamed))
+                    else:
+                        render_content(response_content)
+            completed = True
+        finally:
+            if not completed and (inspect.isgenerator(response_content) or not response_content):
+                partial = "".join(streamed)
+                response_content = (partial + "\n\n" if partial else "") + "⚠️ *Answer interrupted.*"
+            st.session_state.messages.append({"role": "assistant", "content": response_content})
+            # One transaction for the whole turn (question + answer)
+            db.save_turn(st.session_state.current_session_id, prompt, response_content)
\ No newline at end of file
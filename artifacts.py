@@ -0,0 +1,86 @@
+import os
+import glob
+import time
+import hashlib
+import threading
+import db
+
+# ==============================================================================
+# 🖼️ CHART ARTIFACT STORE (Content-addressed, deduplicated)
+# ==============================================================================
+# exports/artifacts/<first 2 hash chars>/<sha256>.png (+ _thumb.png)
+ARTIFACT_DIR = os.path.join("exports", "artifacts")
+LEGACY_CHART_DIR = os.path.join("exports", "charts")
+THUMBNAIL_SIZE = (320, 320)
+GRACE_SECONDS = 6 * 3600   # Unreferenced charts younger than this may belong to a turn still being answered
+
+# Held while storing and while collecting, so a collection can't delete a file
+# between store_bytes() seeing it on disk and registering it
+_store_lock = threading.Lock()
+
+def artifact_path(artifact_id, thumbnail=False):
+    suffix = "_thumb.png" if thumbnail else ".png"
+    return os.path.join(ARTIFACT_DIR, artifact_id[:2], artifact_id + suffix)
+
+def store_bytes(data, mime="image/png"):
+    """
+    Saves chart bytes into the store and returns their ID (sha256).
+    Identical charts are stored once.
+    """
+    artifact_id = hashlib.sha256(data).hexdigest()
+    target = artifact_path(artifact_id)
+
+    with _store_lock:
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+            _make_thumbnail(target, artifact_path(artifact_id, thumbnail=True))
+        # Also refreshes created_at, so a re-stored old orphan gets a new grace period
+        db.register_artifact(artifact_id, mime, len(data))
+    return artifact_id
+
+def _make_thumbnail(source, target):
+    try:
+        from PIL import Image
+        with Image.open(source) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            image.save(target, "PNG", optimize=True)
+    except Exception as e:
+        print(f"⚠️ Thumbnail skipped for {source}: {e}")
+
+def read_bytes(artifact_id, thumbnail=False):
+    """Returns the stored image bytes (falls back to the full image if there's no thumbnail)."""
+    path = artifact_path(artifact_id, thumbnail)
+    if thumbnail and not os.path.exists(path):
+        path = artifact_path(artifact_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+def collect_garbage(grace_seconds=GRACE_SECONDS):
+    """
+    Deletes charts no message references that are older than the grace period:
+    those of deleted sessions, and those of turns that were never saved.
+    Returns how many were removed.
+    """
+    with _store_lock:
+        artifact_ids = db.take_orphan_artifacts(grace_seconds)
+        for artifact_id in artifact_ids:
+            for path in (artifact_path(artifact_id), artifact_path(artifact_id, thumbnail=True)):
+                if os.path.exists(path):
+                    os.remove(path)
+    return len(artifact_ids)
+
+def sweep_stray_charts(max_age_seconds=3600):
+    """Removes leftover temp_chart_*.png files from the old fixed-path chart flow."""
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in glob.glob(os.path.join(LEGACY_CHART_DIR, "temp_chart_*.png")):
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
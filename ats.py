@@ -1,24 +1,126 @@
+import io
+import os
+import re
+import zipfile
+import hashlib
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
 import streamlit as st
-import ollama
+import llm
 from pypdf import PdfReader
-from config import CURRENT_CONFIG
+from cache import LRUCache
+from config import (
+    CURRENT_CONFIG, RESUME_CACHE_SIZE, PDF_PARALLEL_PAGES, PDF_WORKERS,
+    BATCH_LLM_WORKERS, BATCH_TOP_PER_JOB
+)
+
+# ==============================================================================
+# 📑 RESUME PARSING: Extract once per file, split into sections
+# ==============================================================================
+_parsed = LRUCache(RESUME_CACHE_SIZE)   # file sha256 -> {"text", "sections", "pages"}
+_pool_lock = threading.Lock()
+_pool = {"executor": None}
+
+# Heading line -> section. Anything not listed (Education, Projects...) is kept but not sent.
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"),
+    "skills": ("skills", "key skills", "technical skills", "core competencies", "competencies",
+               "areas of expertise", "technologies", "tech stack"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history"),
+    "other": ("education", "projects", "certifications", "awards", "publications", "languages",
+              "interests", "achievements", "references", "volunteering"),
+}
+_HEADING_LOOKUP = {h: section for section, headings in SECTION_HEADINGS.items() for h in headings}
+RELEVANT_SECTIONS = ("summary", "skills", "experience")
+
+def _extract_pages(data, start, end):
+    """Runs in a worker process: text of pages [start, end)."""
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def _get_pool():
+    with _pool_lock:
+        if _pool["executor"] is None:
+            # spawn, not fork: the Streamlit server process is full of running threads
+            _pool["executor"] = ProcessPoolExecutor(max_workers=min(PDF_WORKERS, os.cpu_count() or 1),
+                                                    mp_context=multiprocessing.get_context("spawn"))
+        return _pool["executor"]
+
+def _extract_all_pages(data):
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    if page_count <= PDF_PARALLEL_PAGES:
+        return [page.extract_text() or "" for page in reader.pages]
+
+    # One contiguous page range per worker, so each process parses the file once
+    step = -(-page_count // PDF_WORKERS)
+    futures = [_get_pool().submit(_extract_pages, data, start, min(start + step, page_count))
+               for start in range(0, page_count, step)]
+    return [text for future in futures for text in future.result()]
+
+def split_sections(text):
+    """
+    Splits resume text on recognised heading lines. Returns {section: text};
+    whatever comes before the first heading (name, contact details) is "header".
+    """
+    sections = {}
+    current, lines = "header", []
+    for line in text.splitlines():
+        key = re.sub(r"[^a-z ]", "", line.lower()).strip()
+        section = _HEADING_LOOKUP.get(key) if len(key) <= 40 else None
+        if section:
+            if lines:
+                sections[current] = (sections.get(current, "") + "\n" + "\n".join(lines)).strip()
+            current, lines = section, []
+        else:
+            lines.append(line)
+    if lines:
+        sections[current] = (sections.get(current, "") + "\n" + "\n".join(lines)).strip()
+    return sections
+
+def extract_resume(uploaded_file):
+    """
+    Parses the uploaded PDF once per file content.
+    Returns {"text", "sections", "pages"}.
+    """
+    return parse_pdf_bytes(uploaded_file.getvalue())
+
+def parse_pdf_bytes(data):
+    file_hash = hashlib.sha256(data).hexdigest()
+    parsed = _parsed.get(file_hash)
+    if parsed is None:
+        pages = _extract_all_pages(data)
+        text = "\n".join(pages)
+        parsed = {"text": text, "sections": split_sections(text), "pages": len(pages)}
+        _parsed.put(file_hash, parsed)
+    return parsed
+
+def resume_context(parsed):
+    """Only the sections the rewrite needs; the whole text if no headings were recognised."""
+    found = [(name, parsed["sections"][name]) for name in RELEVANT_SECTIONS if parsed["sections"].get(name)]
+    if not found:
+        return parsed["text"]
+    return "\n\n".join(f"{name.upper()}:\n{body}" for name, body in found)
 
 def extract_text(uploaded_file):
     """
-    Reads the uploaded PDF file page by page and returns the raw text.
+    Reads the uploaded PDF file and returns the raw text.
     """
     try:
-        reader = PdfReader(uploaded_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        return extract_resume(uploaded_file)["text"]
     except Exception as e:
         return f"Error reading PDF: {str(e)}"
 
 def optimize_resume(resume_text, job_description):
     """
     Sends the resume + JD to Gemma 2 (9b) for optimization.
+    Yields the answer token by token as it is generated.
     """
     
     # 🎯 The Prompt: We tell Gemma exactly how to behave.
@@ -45,16 +147,140 @@ def optimize_resume(resume_text, job_description):
     OPTIMIZED CONTENT:
     """
 
-    # We use a spinner so the user knows the AI is thinking
-    with st.spinner("✨ Gemma is analyzing your profile..."):
-        try:
-            response = ollama.chat(
-                model=CURRENT_CONFIG['resume_model'],  # <--- USES CONFIG NOW
-                messages=[{'role': 'user', 'content': prompt}]
-            )
-            return response['message']['content']
-        except Exception as e:
-            return f"Error connecting to AI: {str(e)}"
+    # We stream tokens so the user sees the rewrite as soon as Gemma starts writing
+    try:
+        yield from llm.stream_chat(CURRENT_CONFIG['resume_model'], [{'role': 'user', 'content': prompt}])
+    except llm.LLMError as e:
+        yield f"Error connecting to AI: {str(e)}"
+
+# ==============================================================================
+# 📦 BATCH SCREENING: Every resume × every JD, the model only sees the best pairs
+# ==============================================================================
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9+#.]*[a-z0-9+#]|[a-z]")
+SCORE_PATTERN = re.compile(r"SCORE:\s*(\d{1,3})", re.IGNORECASE)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "the", "this", "to", "with", "we", "you", "our", "your", "will", "have", "has", "i",
+}
+
+def _terms(text):
+    return Counter(t for t in WORD_PATTERN.findall(text.lower()) if t not in STOPWORDS)
+
+def tfidf_scores(resumes, jobs):
+    """
+    Cosine similarity of TF-IDF vectors for every (resume, job) pair, as a
+    len(resumes) × len(jobs) matrix in [0, 1]. One matrix product, no LLM.
+    """
+    counts = [_terms(text) for text in list(resumes) + list(jobs)]
+    vocabulary = {term: i for i, term in enumerate(set().union(*counts))}
+    matrix = np.zeros((len(counts), len(vocabulary)), dtype=np.float32)
+    for row, terms in enumerate(counts):
+        for term, count in terms.items():
+            matrix[row, vocabulary[term]] = count
+
+    doc_freq = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(counts)) / (1 + doc_freq)) + 1
+    matrix = np.log1p(matrix) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1, norms)
+    return matrix[:len(resumes)] @ matrix[len(resumes):].T
+
+def read_resume_uploads(uploaded_files):
+    """PDFs and zips of PDFs -> [(file name, parsed resume)]; unreadable files are reported and skipped."""
+    resumes = []
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(uploaded.getvalue())) as archive:
+                members = [(os.path.basename(n), archive.read(n)) for n in archive.namelist()
+                           if n.lower().endswith(".pdf") and not n.startswith("__MACOSX")]
+        else:
+            members = [(uploaded.name, uploaded.getvalue())]
+        for name, data in members:
+            try:
+                resumes.append((name, parse_pdf_bytes(data)))
+            except Exception as e:
+                st.warning(f"⚠️ Skipped {name}: {e}")
+    return resumes
+
+def split_job_descriptions(text):
+    """JDs pasted one after another, separated by a line containing only ---."""
+    return [jd.strip() for jd in re.split(r"^\s*---+\s*$", text, flags=re.MULTILINE) if jd.strip()]
+
+def assess_fit(resume_text, job_description):
+    """Asks the resume model for a 0-100 fit score and a one-line reason."""
+    prompt = f"""
+    You are a senior technical recruiter screening a candidate for a job.
+    Rate how well the candidate fits the job from 0 to 100.
+    Reply in exactly this format:
+    SCORE: <number>
+    REASON: <one sentence>
+    ------------
+    JOB DESCRIPTION:
+    {job_description}
+    ------------
+    CANDIDATE'S RESUME:
+    {resume_text}
+    """
+    answer = llm.chat(CURRENT_CONFIG['resume_model'], [{'role': 'user', 'content': prompt}]).strip()
+    match = SCORE_PATTERN.search(answer)
+    reason = answer.split("REASON:", 1)[-1].strip() if "REASON:" in answer else answer
+    return (min(int(match.group(1)), 100) if match else None), reason
+
+def _job_title(job_description):
+    return job_description.splitlines()[0][:60]
+
+def render_batch_page():
+    st.info("Upload many resumes (PDFs or a .zip) and several job descriptions separated by a line with `---`. "
+            "Every pair is keyword-scored locally; only the best matches per job go to the AI.")
+    col1, col2 = st.columns(2)
+    with col1:
+        uploaded_files = st.file_uploader("1. Upload Resumes (PDF or ZIP)", type=["pdf", "zip"],
+                                          accept_multiple_files=True)
+        top_per_job = st.number_input("Candidates per job sent to the AI", min_value=0, max_value=50,
+                                      value=BATCH_TOP_PER_JOB)
+    with col2:
+        jobs_text = st.text_area("2. Paste Job Descriptions (separate with ---)", height=250)
+
+    if not st.button("📊 Screen Candidates"):
+        return
+    jobs = split_job_descriptions(jobs_text or "")
+    if not uploaded_files or not jobs:
+        st.warning("Please upload resumes and paste at least one Job Description first.")
+        return
+
+    with st.spinner("Reading resumes..."):
+        resumes = read_resume_uploads(uploaded_files)
+    if not resumes:
+        st.error("Could not read any of the uploaded resumes.")
+        return
+
+    contexts = [resume_context(parsed) for _, parsed in resumes]
+    scores = tfidf_scores(contexts, jobs)
+    rows = [{"Resume": name, "Job": _job_title(jobs[j]), "Keyword Match %": round(float(scores[i, j]) * 100, 1),
+             "AI Score": None, "AI Assessment": ""}
+            for i, (name, _) in enumerate(resumes) for j in range(len(jobs))]
+
+    # Only the top keyword matches of each job are worth a model call
+    shortlist = [(i, j) for j in range(len(jobs)) for i in np.argsort(-scores[:, j])[:int(top_per_job)]]
+    if shortlist:
+        progress = st.progress(0.0, text=f"🤖 AI reviewing {len(shortlist)} shortlisted pairs...")
+        with ThreadPoolExecutor(max_workers=BATCH_LLM_WORKERS) as pool:
+            futures = {pool.submit(assess_fit, contexts[i], jobs[j]): (i, j) for i, j in shortlist}
+            for done, future in enumerate(as_completed(futures), start=1):
+                i, j = futures[future]
+                row = rows[i * len(jobs) + j]
+                try:
+                    row["AI Score"], row["AI Assessment"] = future.result()
+                except Exception as e:
+                    row["AI Assessment"] = f"Error connecting to AI: {str(e)}"
+                progress.progress(done / len(shortlist), text=f"🤖 Reviewed {done}/{len(shortlist)} pairs")
+        progress.empty()
+
+    results = pd.DataFrame(rows).sort_values(["Job", "AI Score", "Keyword Match %"],
+                                             ascending=[True, False, False], na_position="last")
+    st.dataframe(results, use_container_width=True, hide_index=True)
+    st.download_button("⬇️ Download Results (CSV)", results.to_csv(index=False).encode("utf-8"),
+                       file_name="ats_screening.csv", mime="text/csv")
 
 def render_ats_page():
     """
@@ -62,6 +288,11 @@ def render_ats_page():
     """
     st.header("📄 Resume ATS Optimizer")
     st.markdown("### beat the bot. Get the Interview.")
+
+    if st.radio("Mode", ["Single Resume", "Batch Screening"], horizontal=True) == "Batch Screening":
+        render_batch_page()
+        return
+
     st.info("Upload your current resume and paste the job description you want. Gemma 2 will rewrite your Summary & Skills to match.")
 
     # Two columns layout
@@ -76,17 +307,19 @@ def render_ats_page():
     # The Trigger Button
     if st.button("🚀 Optimize My Resume"):
         if uploaded_file and job_desc:
-            # Step A: Extract Text
-            raw_text = extract_text(uploaded_file)
+            # Step A: Extract Text (cached per file, split into sections)
+            try:
+                parsed = extract_resume(uploaded_file)
+            except Exception as e:
+                st.error(f"Error reading PDF: {str(e)}")
+                return
             
             # Step B: Generate
-            if len(raw_text) > 50: # Basic check to ensure PDF wasn't empty
-                optimized_text = optimize_resume(raw_text, job_desc)
-                
-                # Step C: Display Result
-                st.success("Optimization Complete!")
+            if len(parsed["text"]) > 50: # Basic check to ensure PDF wasn't empty
+                # Step C: Display Result (streamed as Gemma writes it)
                 st.subheader("Your New Profile Sections:")
-                st.markdown(optimized_text)
+                st.write_stream(optimize_resume(resume_context(parsed), job_desc))
+                st.success("Optimization Complete!")
                 st.caption("Copy and paste these sections into your Word doc.")
             else:
                 st.error("Could not read text from the PDF. Is it a scanned image?")
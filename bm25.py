@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter
+from langchain_core.documents import Document
+
+# ==============================================================================
+# 🔎 KEYWORD INDEX (BM25): Catches exact statute names & section numbers
+# ==============================================================================
+# Kept next to the Chroma files and updated by ingest.py in the same run.
+BM25_DB = os.path.join("vector_db", "bm25.db")
+K1 = 1.5
+B = 0.75
+NEVER_RETIRED = 2**31 - 1   # kb_retired of a chunk that is still current (see ingest.py versioning)
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which",
+    "who", "why", "how", "with", "does", "do", "did", "about", "tell", "me", "our", "we",
+}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_write_lock = threading.Lock()
+
+def tokenize(text):
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+def _connect():
+    os.makedirs(os.path.dirname(BM25_DB), exist_ok=True)
+    conn = sqlite3.connect(BM25_DB)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS chunks (
+            chunk_id TEXT PRIMARY KEY,
+            source TEXT,
+            content TEXT,
+            metadata TEXT,
+            length INTEGER
+        )
+    ''')
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(chunks)')}
+    if "kb_version" not in columns:
+        # Chunk lifetime in KB versions; rows indexed before versioning are visible in all of them
+        conn.execute('ALTER TABLE chunks ADD COLUMN kb_version INTEGER DEFAULT 0')
+        conn.execute(f'ALTER TABLE chunks ADD COLUMN kb_retired INTEGER DEFAULT {NEVER_RETIRED}')
+        conn.commit()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS postings (
+            term TEXT,
+            chunk_id TEXT,
+            tf INTEGER,
+            PRIMARY KEY (term, chunk_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings (chunk_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source)')
+    return conn
+
+def _delete_ids(c, chunk_ids):
+    for cid in chunk_ids:
+        c.execute('DELETE FROM postings WHERE chunk_id = ?', (cid,))
+        c.execute('DELETE FROM chunks WHERE chunk_id = ?', (cid,))
+
+def add_chunks(chunks):
+    """
+    Indexes (chunk_id, Document) pairs, replacing any previous version of the same IDs.
+    The KB version they belong to is read from the metadata (kb_version, see ingest.py).
+    """
+    if not chunks:
+        return
+    with _write_lock:
+        conn = _connect()
+        c = conn.cursor()
+        _delete_ids(c, [cid for cid, _ in chunks])
+        for cid, doc in chunks:
+            meta = doc.metadata or {}
+            terms = Counter(tokenize(doc.page_content))
+            c.execute('''
+                INSERT INTO chunks (chunk_id, source, content, metadata, length, kb_version, kb_retired)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (cid, meta.get("source"), doc.page_content, json.dumps(meta), sum(terms.values()),
+                  meta.get("kb_version", 0), meta.get("kb_retired", NEVER_RETIRED)))
+            c.executemany('INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)',
+                          [(term, cid, tf) for term, tf in terms.items()])
+        conn.commit()
+        conn.close()
+
+def retire_source(source, version, keep_ids=()):
+    """
+    Hides a file's current chunks from KB version `version` on (except keep_ids).
+    They stay searchable under older versions until purge_retired() deletes them.
+    """
+    keep_ids = set(keep_ids)
+    with _write_lock:
+        conn = _connect()
+        rows = conn.execute('SELECT chunk_id FROM chunks WHERE source = ? AND kb_retired > ?',
+                            (source, version)).fetchall()
+        conn.executemany('UPDATE chunks SET kb_retired = ? WHERE chunk_id = ?',
+                         [(version, cid) for cid, in rows if cid not in keep_ids])
+        conn.commit()
+        conn.close()
+
+def purge_retired(version):
+    """Deletes the chunks retired at or before `version` (no reader can see them any more)."""
+    with _write_lock:
+        conn = _connect()
+        c = conn.cursor()
+        c.execute('SELECT chunk_id FROM chunks WHERE kb_retired <= ?', (version,))
+        _delete_ids(c, [row[0] for row in c.fetchall()])
+        conn.commit()
+        conn.close()
+
+def is_empty():
+    conn = _connect()
+    count = conn.execute('SELECT COUNT(*) FROM chunks').fetchone()[0]
+    conn.close()
+    return count == 0
+
+def search(query, k=10, kb_version=None):
+    """
+    Returns [(chunk_id, score)] for the best BM25 matches, highest first.
+    With kb_version, only chunks that belong to that KB version are considered.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+    visible, params = "1", ()
+    if kb_version is not None:
+        visible, params = "ch.kb_version <= ? AND ch.kb_retired > ?", (kb_version, kb_version)
+    conn = _connect()
+    c = conn.cursor()
+    total, avg_length = c.execute(f'SELECT COUNT(*), AVG(length) FROM chunks ch WHERE {visible}', params).fetchone()
+    if not total:
+        conn.close()
+        return []
+    avg_length = avg_length or 1.0
+
+    scores = Counter()
+    for term in terms:
+        c.execute(f'''
+            SELECT p.chunk_id, p.tf, ch.length FROM postings p
+            JOIN chunks ch ON ch.chunk_id = p.chunk_id
+            WHERE p.term = ? AND {visible}
+        ''', (term, *params))
+        rows = c.fetchall()
+        if not rows:
+            continue
+        idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+        for cid, tf, length in rows:
+            scores[cid] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+    conn.close()
+    return scores.most_common(k)
+
+def get_documents(chunk_ids):
+    """Loads the indexed chunks back as Documents, keyed by chunk ID."""
+    if not chunk_ids:
+        return {}
+    conn = _connect()
+    placeholders = ",".join("?" * len(chunk_ids))
+    rows = conn.execute(f'SELECT chunk_id, content, metadata FROM chunks WHERE chunk_id IN ({placeholders})',
+                        list(chunk_ids)).fetchall()
+    conn.close()
+    return {cid: Document(page_content=content, metadata=json.loads(metadata)) for cid, content, metadata in rows}
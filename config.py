@@ -18,6 +18,7 @@ SETTINGS = {
         "resume_model": "llama3.1",        # Less creative, but functional
         "data_agent_model": "llama3.1",    # Weaker at coding
         "allow_data_analysis": False,      # DISABLES the Data Agent (Upsell feature)
+        "context_token_budget": 1200,      # Max RAG context tokens in the legal prompt
         "system_name": "AI Agency LITE"
     },
     
@@ -28,9 +29,105 @@ SETTINGS = {
         "resume_model": "gemma2:9b",          # The Creative Writer
         "data_agent_model": "qwen2.5-coder:32b",
         "allow_data_analysis": True,          # ENABLES Python execution
+        "context_token_budget": 2000,         # 32B on CPU: every prompt token costs
         "system_name": "AI Agency PRO (Sovereign Edition)"
     }
 }
 
 # Load the active configuration
-CURRENT_CONFIG = SETTINGS[VERSION_TIER]
\ No newline at end of file
+CURRENT_CONFIG = SETTINGS[VERSION_TIER]
+
+# =========================================================
+# 🧭 ROUTER TUNING
+# =========================================================
+# The router first tries cheap local rules + an embedding classifier and only
+# asks the manager model when those are unsure.
+# Confidence = similarity gap between the best and runner-up department.
+# Raise it to send more queries to the LLM, lower it to skip more LLM calls.
+ROUTER_CONFIDENCE_THRESHOLD = 0.08
+EMBEDDING_MODEL = "nomic-embed-text"
+
+# =========================================================
+# ⚡ PIPELINE TUNING
+# =========================================================
+# Start the legal vector search while the router is still deciding.
+# The speculative result is simply discarded if the query isn't 'legal'.
+SPECULATIVE_RETRIEVAL = True
+
+# =========================================================
+# ⚖️ LEGAL RETRIEVAL
+# =========================================================
+# Vector and BM25 keyword results are fused with Reciprocal Rank Fusion.
+HYBRID_FETCH_K = 10   # Candidates pulled from each retriever before fusion
+RRF_K = 60            # Standard RRF damping constant
+# Optional CPU cross-encoder reranker (needs `sentence-transformers`).
+# e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"; None disables reranking.
+RERANKER_MODEL = None
+
+# =========================================================
+# 🗃️ CACHE SIZES (entries, shared by all sessions)
+# =========================================================
+CACHE_DB = "cache.db"        # Persistent caches live next to history.db
+EMBEDDING_CACHE_SIZE = 512   # Query text -> embedding vector
+RETRIEVAL_CACHE_SIZE = 256   # (embedding, k, KB version) -> top-k chunks
+
+# Legal answers are reused when a new question is this close (cosine distance)
+# to an answered one AND retrieves exactly the same chunks. Stored in cache.db.
+ANSWER_CACHE_MAX_DISTANCE = 0.05
+ANSWER_CACHE_MAX_ENTRIES = 1000
+
+# Data-agent code that ran successfully, reused for the same request + schema
+CODE_CACHE_MAX_ENTRIES = 500
+
+# =========================================================
+# 🧪 DATA SANDBOX (Generated code runs in worker processes)
+# =========================================================
+SANDBOX_WORKERS = 2          # Prewarmed worker processes
+SANDBOX_MAX_RUNS = 20        # Recycle a worker after this many runs
+SANDBOX_WALL_SECONDS = 60    # Kill a run that takes longer than this
+SANDBOX_WARM_SECONDS = 300   # Max time for a worker to load the active dataset
+SANDBOX_CPU_SECONDS = 60     # CPU time per run (Linux/macOS only)
+SANDBOX_MEMORY_MB = 4096     # Address-space cap per worker (Linux/macOS only)
+
+# =========================================================
+# 🐘 OUT-OF-CORE DATA (CSVs bigger than the sandbox can hold)
+# =========================================================
+DATA_ENGINE = "auto"         # "auto", or force "memory" / "duckdb" / "chunked"
+IN_MEMORY_FRACTION = 0.5     # Use pandas only if the frame needs < this share of free RAM
+PANDAS_OVERHEAD = 3          # DataFrame size ≈ Arrow size × this (object columns, copies)
+DUCKDB_MEMORY_MB = 2048      # DuckDB spills to disk beyond this
+
+# =========================================================
+# 🎙️ VOICE (Whisper runs on one shared worker thread)
+# =========================================================
+WHISPER_MODEL = "base"
+VOICE_QUEUE_SIZE = 4           # Clips waiting for Whisper; more than this -> "busy"
+VOICE_THREADS = 2              # CPU threads Whisper may use
+TRANSCRIPT_CACHE_SIZE = 128    # Transcriptions by audio hash
+VOICE_TIMEOUT_SECONDS = 120
+VAD_THRESHOLD_DB = 12          # Speech = this much louder than the clip's noise floor
+VAD_MIN_DB = -50               # ...and at least this loud (dBFS)
+VAD_MIN_SPEECH_MS = 250        # Shorter bursts are clicks/noise
+VAD_PAD_MS = 200               # Kept around each speech segment so words aren't clipped
+
+# =========================================================
+# 📄 RESUME PARSING
+# =========================================================
+RESUME_CACHE_SIZE = 64       # Parsed PDFs by file hash
+PDF_PARALLEL_PAGES = 6       # Documents with more pages are extracted in parallel
+PDF_WORKERS = 4              # Processes for parallel extraction (capped at the CPU count)
+BATCH_LLM_WORKERS = 2        # Concurrent resume-model calls in batch screening
+BATCH_TOP_PER_JOB = 3        # Best keyword matches per job sent to the model
+
+# =========================================================
+# 🚦 LLM GATEWAY (Every model call goes through llm.py)
+# =========================================================
+LLM_CONNECT_TIMEOUT = 5          # Seconds to reach Ollama
+LLM_TIMEOUT_SECONDS = 300        # Max silence between streamed tokens (CPU inference is slow)
+LLM_RETRIES = 2                  # Retries for connection errors / 5xx before any token arrived
+LLM_RETRY_BACKOFF = 0.5          # Seconds, doubled per retry
+LLM_MAX_CONNECTIONS = 8          # Pooled keep-alive connections to Ollama
+LLM_DEFAULT_CONCURRENCY = 2      # Concurrent requests per model; the rest queue
+LLM_MODEL_CONCURRENCY = {}       # Per-model overrides, e.g. {"gemma2:9b": 1}
+LLM_QUEUE_TIMEOUT = 120          # Give up after waiting this long for a model slot
+LLM_METRICS_WINDOW = 500         # Recent calls kept for the metrics summary
@@ -0,0 +1,235 @@
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from config import DATA_ENGINE, IN_MEMORY_FRACTION, PANDAS_OVERHEAD, SANDBOX_MEMORY_MB
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# ==============================================================================
+# 📊 DATASET CACHE: Parse the uploaded CSV once, reuse it everywhere
+# ==============================================================================
+UPLOAD_DIR = "uploads"
+ACTIVE_CSV = os.path.join(UPLOAD_DIR, "active_data.csv")
+ACTIVE_POINTER = os.path.join(UPLOAD_DIR, "active_data.json")
+CACHE_DIR = os.path.join(UPLOAD_DIR, "cache")
+
+STREAM_BLOCK_BYTES = 16 * 1024 * 1024   # CSV bytes per Arrow record batch during conversion
+
+_convert_lock = threading.Lock()
+
+def file_hash(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def arrow_path(data_hash):
+    return os.path.join(CACHE_DIR, f"{data_hash}.arrow")
+
+def summary_path(data_hash):
+    return os.path.join(CACHE_DIR, f"{data_hash}.json")
+
+def _update_stats(stats, batch):
+    """Folds one record batch into running per-column null counts and min/max."""
+    for field, column in zip(batch.schema, batch.columns):
+        info = stats.setdefault(field.name, {"name": field.name, "dtype": str(field.type), "nulls": 0})
+        info["nulls"] += column.null_count
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or pa.types.is_temporal(field.type):
+            bounds = pc.min_max(column)
+            low, high = bounds["min"].as_py(), bounds["max"].as_py()
+            if low is not None:
+                info["min"] = low if info.get("min") is None else min(info["min"], low)
+                info["max"] = high if info.get("max") is None else max(info["max"], high)
+
+def _stream_to_arrow(csv_path, target, column_types=None):
+    """
+    Converts batch by batch, so a CSV larger than RAM never has to be held in memory.
+    Returns (rows, in-memory bytes, per-column stats).
+    """
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=STREAM_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types or {})
+    )
+    rows, nbytes, stats = 0, 0, {}
+    with pa.ipc.new_file(target, reader.schema) as writer:   # Uncompressed IPC == Feather v2
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            nbytes += batch.nbytes
+            _update_stats(stats, batch)
+    return rows, nbytes, stats
+
+def _convert_with_arrow(csv_path, target):
+    try:
+        return _stream_to_arrow(csv_path, target)
+    except pa.ArrowInvalid:
+        # Types guessed from the first block didn't hold for the rest of the file
+        if os.path.getsize(csv_path) * PANDAS_OVERHEAD < _memory_budget():
+            table = pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+            feather.write_feather(table, target, compression="uncompressed")
+            stats = {}
+            for batch in table.to_batches():
+                _update_stats(stats, batch)
+            return table.num_rows, table.nbytes, stats
+        # Too big for pandas' inference: keep every column as text, the model can cast
+        names = pa_csv.open_csv(csv_path).schema.names
+        return _stream_to_arrow(csv_path, target, {name: pa.string() for name in names})
+
+def _build_summary(rows, nbytes, stats, csv_path, data_hash, name):
+    columns = []
+    for info in stats.values():
+        if "min" in info:
+            info["min"], info["max"] = str(info["min"]), str(info["max"])
+        columns.append(info)
+    return {
+        "hash": data_hash, "name": name, "rows": rows, "memory_bytes": nbytes,
+        "csv_bytes": os.path.getsize(csv_path), "columns": columns,
+    }
+
+def _build_summary_pandas(df, csv_path, data_hash, name):
+    columns = [{"name": str(col), "dtype": str(df[col].dtype), "nulls": int(df[col].isna().sum())} for col in df.columns]
+    return {
+        "hash": data_hash, "name": name, "rows": len(df),
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+        "csv_bytes": os.path.getsize(csv_path), "columns": columns,
+    }
+
+def _build_summary_chunked(csv_path, data_hash, name, chunk_rows=200_000):
+    """Without pyarrow, a CSV bigger than RAM is summarised one pandas chunk at a time."""
+    rows, nbytes, columns = 0, 0, None
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        if columns is None:
+            columns = [{"name": str(col), "dtype": str(chunk[col].dtype), "nulls": 0} for col in chunk.columns]
+        for info, col in zip(columns, chunk.columns):
+            info["nulls"] += int(chunk[col].isna().sum())
+        rows += len(chunk)
+        nbytes += int(chunk.memory_usage(deep=True).sum())
+    return {
+        "hash": data_hash, "name": name, "rows": rows, "memory_bytes": nbytes,
+        "csv_bytes": os.path.getsize(csv_path), "columns": columns or [],
+    }
+
+def convert(csv_path, name=None):
+    """
+    Converts a CSV into an uncompressed Arrow IPC file (memory-mappable) plus a
+    schema/stats summary, once per content hash. Streams, so it works for CSVs
+    larger than RAM. Returns the summary.
+    """
+    data_hash = file_hash(csv_path)
+    with _convert_lock:
+        if os.path.exists(summary_path(data_hash)):
+            with open(summary_path(data_hash), "r") as f:
+                return json.load(f)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        if pa is not None:
+            tmp_path = arrow_path(data_hash) + ".tmp"
+            rows, nbytes, stats = _convert_with_arrow(csv_path, tmp_path)
+            os.replace(tmp_path, arrow_path(data_hash))
+            summary = _build_summary(rows, nbytes, stats, csv_path, data_hash, name)
+        elif os.path.getsize(csv_path) * PANDAS_OVERHEAD < _memory_budget():
+            df = pd.read_csv(csv_path)
+            summary = _build_summary_pandas(df, csv_path, data_hash, name)
+        else:
+            summary = _build_summary_chunked(csv_path, data_hash, name)
+
+        # Decided once per dataset: the prompt's API and the code-cache key depend on it
+        summary["engine"] = choose_engine(summary)
+        _save_summary(summary)
+        return summary
+
+def _save_summary(summary):
+    tmp_path = summary_path(summary["hash"]) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f)
+    os.replace(tmp_path, summary_path(summary["hash"]))
+
+def activate(name, data):
+    """Saves an uploaded CSV as the active analysis dataset and converts it. Returns the summary."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    with open(ACTIVE_CSV, "wb") as f:
+        f.write(data)
+    summary = convert(ACTIVE_CSV, name)
+    with open(ACTIVE_POINTER, "w") as f:
+        json.dump({"hash": summary["hash"], "name": name}, f)
+    return summary
+
+def get_active():
+    """
+    Returns the active dataset's summary (rows, columns, dtypes, stats, and the
+    engine it is analysed with) without touching the data itself, or None if
+    nothing is loaded. DATA_ENGINE, if set, overrides the stored engine.
+    """
+    if not os.path.exists(ACTIVE_CSV):
+        return None
+    try:
+        with open(ACTIVE_POINTER, "r") as f:
+            data_hash = json.load(f)["hash"]
+        with open(summary_path(data_hash), "r") as f:
+            summary = json.load(f)
+    except (OSError, ValueError, KeyError):
+        # A CSV loaded before the cache existed: convert it once
+        summary = convert(ACTIVE_CSV, os.path.basename(ACTIVE_CSV))
+        with open(ACTIVE_POINTER, "w") as f:
+            json.dump({"hash": summary["hash"], "name": summary["name"]}, f)
+    if "engine" not in summary:
+        # Converted before engines existed: decide once and remember it
+        summary["engine"] = choose_engine(summary)
+        _save_summary(summary)
+    if DATA_ENGINE != "auto":
+        summary["engine"] = DATA_ENGINE
+    return summary
+
+def available_memory():
+    """Bytes of RAM currently free for new allocations (None if unknown)."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _memory_budget():
+    """How much a DataFrame may use: a share of free RAM, never more than the sandbox cap."""
+    cap = SANDBOX_MEMORY_MB * 1024 * 1024
+    free = available_memory()
+    return IN_MEMORY_FRACTION * (min(free, cap) if free else cap)
+
+def choose_engine(summary):
+    """
+    "memory" (plain pandas DataFrame), "duckdb" (SQL over the Arrow file, spills
+    to disk) or "chunked" (pandas chunks, when DuckDB isn't installed), from
+    the dataset's size against the memory free at conversion time.
+    """
+    size = summary.get("memory_bytes") or summary.get("csv_bytes", 0)
+    if size * PANDAS_OVERHEAD < _memory_budget():
+        return "memory"
+    return "duckdb" if duckdb is not None else "chunked"
+
+def unload():
+    """Forgets the active dataset (converted files stay cached for a re-upload)."""
+    for path in (ACTIVE_CSV, ACTIVE_POINTER):
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,75 +1,215 @@
 import sqlite3
 import json
-from datetime import datetime
+import queue
+import threading
+from contextlib import contextmanager
 
 DB_NAME = "history.db"
+POOL_SIZE = 4   # Connections kept open and shared by all Streamlit sessions
+SEARCH_CANDIDATES = 500    # Newest matches ranked per search; bounds the cost of broad queries
+MIN_PREFIX_CHARS = 3       # Shortest last word searched as a prefix (matches the FTS prefix index)
+
+# ==============================================================================
+# 🔌 CONNECTION POOL
+# ==============================================================================
+_pool = queue.Queue(maxsize=POOL_SIZE)
+_init_lock = threading.Lock()
+
+def _open_connection():
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')      # Readers don't block the writer
+    conn.execute('PRAGMA synchronous=NORMAL')    # Safe with WAL, far fewer fsyncs
+    conn.execute('PRAGMA busy_timeout=5000')
+    return conn
+
+@contextmanager
+def get_connection():
+    """
+    Borrows a pooled connection for one transaction.
+    Commits on success, rolls back on error, then returns it to the pool.
+    """
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# ==============================================================================
+# 🧬 SCHEMA MIGRATIONS (tracked with PRAGMA user_version)
+# ==============================================================================
+# Append new steps to the end; never edit a step that has already shipped.
+MIGRATIONS = [
+    # 1. Sessions (Conversations) & Messages (The actual chat)
+    '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        role TEXT,
+        content TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(session_id) REFERENCES sessions(id)
+    );
+    ''',
+    # 2. Background jobs (e.g. Knowledge Base ingestion)
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT,
+        payload TEXT,
+        status TEXT DEFAULT 'queued',
+        progress TEXT,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP
+    );
+    ''',
+    # 3. Indexes: load/delete by session, job polling by status
+    '''
+    CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, kind);
+    ''',
+    # 4. Cached message count per session, kept in sync by triggers
+    '''
+    ALTER TABLE sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0;
+    UPDATE sessions SET message_count = (SELECT COUNT(*) FROM messages WHERE messages.session_id = sessions.id);
+    CREATE TRIGGER IF NOT EXISTS trg_messages_count_insert AFTER INSERT ON messages BEGIN
+        UPDATE sessions SET message_count = message_count + 1 WHERE id = NEW.session_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_messages_count_delete AFTER DELETE ON messages BEGIN
+        UPDATE sessions SET message_count = message_count - 1 WHERE id = OLD.session_id;
+    END;
+    ''',
+    # 5. Full-text search over message content (external-content FTS5, synced by triggers)
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content, content='messages', content_rowid='id', tokenize='porter unicode61'
+    );
+    INSERT INTO messages_fts(messages_fts) VALUES ('rebuild');
+    CREATE TRIGGER IF NOT EXISTS trg_messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (NEW.id, NEW.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (NEW.id, NEW.content);
+    END;
+    ''',
+    # 6. Content-addressed chart artifacts and the messages that reference them
+    '''
+    CREATE TABLE IF NOT EXISTS artifacts (
+        id TEXT PRIMARY KEY,
+        mime TEXT,
+        size INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS artifact_refs (
+        artifact_id TEXT,
+        message_id INTEGER,
+        PRIMARY KEY (artifact_id, message_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_artifact_refs_message ON artifact_refs (message_id);
+    CREATE TRIGGER IF NOT EXISTS trg_messages_artifact_refs_delete AFTER DELETE ON messages BEGIN
+        DELETE FROM artifact_refs WHERE message_id = OLD.id;
+    END;
+    ''',
+    # 7. Rebuild the search index with 3-char prefix terms, so "word*" is one lookup instead of a term scan
+    '''
+    DROP TRIGGER IF EXISTS trg_messages_fts_insert;
+    DROP TRIGGER IF EXISTS trg_messages_fts_delete;
+    DROP TRIGGER IF EXISTS trg_messages_fts_update;
+    DROP TABLE IF EXISTS messages_fts;
+    CREATE VIRTUAL TABLE messages_fts USING fts5(
+        content, content='messages', content_rowid='id', tokenize='porter unicode61', prefix='3'
+    );
+    INSERT INTO messages_fts(messages_fts) VALUES ('rebuild');
+    CREATE TRIGGER trg_messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (NEW.id, NEW.content);
+    END;
+    CREATE TRIGGER trg_messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+    END;
+    CREATE TRIGGER trg_messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (NEW.id, NEW.content);
+    END;
+    ''',
+]
 
 def init_db():
-    """Creates the database table if it doesn't exist."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Create table for Sessions (Conversations)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create table for Messages (The actual chat)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
-            role TEXT,
-            content TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(session_id) REFERENCES sessions(id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    """Creates the tables if needed and upgrades older history.db files to the latest schema."""
+    with _init_lock:
+        conn = _open_connection()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for step, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                conn.executescript('BEGIN;' + script + f'PRAGMA user_version = {step};COMMIT;')
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"💾 History DB migrated to schema v{step}")
+        conn.close()
+
+# ==============================================================================
+# 💬 SESSIONS & MESSAGES
+# ==============================================================================
+def _serialize(content):
+    # If content is a dict (like a chart image), convert to string
+    if isinstance(content, dict):
+        return json.dumps(content)
+    return content
 
 def create_session(first_message):
     """Starts a new chat session."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
     # Use the first 30 chars of the message as the Title
     title = first_message[:30] + "..."
-    
-    c.execute('INSERT INTO sessions (title) VALUES (?)', (title,))
-    session_id = c.lastrowid
-    
-    conn.commit()
-    conn.close()
-    return session_id
+    with get_connection() as conn:
+        c = conn.execute('INSERT INTO sessions (title) VALUES (?)', (title,))
+        return c.lastrowid
+
+def _insert_message(conn, session_id, role, content):
+    c = conn.execute('INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)',
+                     (session_id, role, _serialize(content)))
+    # Charts are stored once as artifacts; the message just holds a reference
+    if isinstance(content, dict) and content.get("artifact"):
+        conn.execute('INSERT OR IGNORE INTO artifact_refs (artifact_id, message_id) VALUES (?, ?)',
+                     (content["artifact"], c.lastrowid))
+    return c.lastrowid
 
 def save_message(session_id, role, content):
     """Saves a single message to the DB."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # If content is a dict (like a chart image), convert to string
-    if isinstance(content, dict):
-        content = json.dumps(content)
-        
-    c.execute('INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)', 
-              (session_id, role, content))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        return _insert_message(conn, session_id, role, content)
+
+def save_turn(session_id, user_content, assistant_content):
+    """Saves the user's message and the assistant's reply in one transaction."""
+    with get_connection() as conn:
+        _insert_message(conn, session_id, "user", user_content)
+        return _insert_message(conn, session_id, "assistant", assistant_content)
 
 def load_messages(session_id):
     """Retrieves full history for a specific session."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    c.execute('SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC', (session_id,))
-    rows = c.fetchall()
-    
+    with get_connection() as conn:
+        rows = conn.execute('SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC',
+                            (session_id,)).fetchall()
+
     messages = []
     for role, content in rows:
         # Check if it's a JSON string (for charts)
@@ -79,31 +219,164 @@ def load_messages(session_id):
         except:
             pass
         messages.append({"role": role, "content": content})
-        
-    conn.close()
     return messages
 
 def get_all_sessions():
     """Returns a list of all past conversations."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('SELECT id, title, created_at FROM sessions ORDER BY id DESC')
-    sessions = c.fetchall()
-    conn.close()
-    return sessions
+    with get_connection() as conn:
+        return conn.execute('SELECT id, title, created_at FROM sessions ORDER BY id DESC').fetchall()
+
+def get_sessions_page(limit=20, before_id=None, title_filter=None):
+    """
+    Keyset-paginated session list, newest first.
+    Returns (rows, next_cursor); rows are (id, title, created_at, message_count)
+    and next_cursor is None on the last page.
+    """
+    query = 'SELECT id, title, created_at, message_count FROM sessions WHERE 1 = 1'
+    params = []
+    if before_id is not None:
+        query += ' AND id < ?'
+        params.append(before_id)
+    if title_filter:
+        query += " AND title LIKE ? ESCAPE '\\'"
+        escaped = title_filter.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    query += ' ORDER BY id DESC LIMIT ?'
+    params.append(limit + 1)   # One extra row tells us whether there's a next page
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1][0]
+    return rows, None
+
+def _fts_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word must match, the last one
+    as a prefix once it has MIN_PREFIX_CHARS characters (shorter prefixes would
+    expand to thousands of terms and aren't in the prefix index).
+    """
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    if len(words[-1]) >= MIN_PREFIX_CHARS:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def search_messages(query, limit=20):
+    """
+    Full-text search across every conversation, best matches first.
+    Returns dicts with session_id, title, snippet (matches wrapped in **) and message_id.
+    Only the newest SEARCH_CANDIDATES matches are ranked, so a broad query costs
+    the same on a million messages as on a thousand.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    with get_connection() as conn:
+        # FTS5 walks the matches in rowid order, so the inner LIMIT stops it after the
+        # newest candidates; only those are scored, then the few winners are joined
+        rows = conn.execute('''
+            SELECT m.session_id, s.title, f.snippet, m.id
+            FROM (
+                SELECT rowid, snippet, score FROM (
+                    SELECT rowid, snippet(messages_fts, 0, '**', '**', '…', 12) AS snippet,
+                           bm25(messages_fts) AS score
+                    FROM messages_fts WHERE messages_fts MATCH ?
+                    ORDER BY rowid DESC LIMIT ?
+                ) ORDER BY score LIMIT ?
+            ) f
+            JOIN messages m ON m.id = f.rowid
+            JOIN sessions s ON s.id = m.session_id
+            ORDER BY f.score
+        ''', (match, SEARCH_CANDIDATES, limit)).fetchall()
+    return [{"session_id": sid, "title": title, "snippet": snippet, "message_id": mid}
+            for sid, title, snippet, mid in rows]
 
 def delete_session(session_id):
-    """Permanently deletes a session and its messages."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Delete messages first (Foreign Key cleanup)
-    c.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
-    # Delete the session itself
-    c.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
-    
-    conn.commit()
-    conn.close()
-    
+    """
+    Permanently deletes a session and its messages.
+    Charts they referenced are left to artifacts.collect_garbage().
+    """
+    with get_connection() as conn:
+        # Delete messages first (Foreign Key cleanup)
+        conn.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+        # Delete the session itself
+        conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+# ==============================================================================
+# 🖼️ ARTIFACTS
+# ==============================================================================
+def register_artifact(artifact_id, mime, size):
+    """Records a stored chart. Storing it again restarts its grace period (created_at)."""
+    with get_connection() as conn:
+        conn.execute('''
+            INSERT INTO artifacts (id, mime, size) VALUES (?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET created_at = CURRENT_TIMESTAMP
+        ''', (artifact_id, mime, size))
+
+def take_orphan_artifacts(grace_seconds):
+    """
+    Removes the rows of artifacts no message references that were stored more
+    than grace_seconds ago, and returns their IDs (the caller deletes the files).
+    Younger ones may belong to a turn that hasn't been saved yet.
+    """
+    with get_connection() as conn:
+        orphans = [row[0] for row in conn.execute('''
+            SELECT a.id FROM artifacts a
+            WHERE a.created_at < datetime('now', ?)
+              AND NOT EXISTS (SELECT 1 FROM artifact_refs r WHERE r.artifact_id = a.id)
+        ''', (f"-{int(grace_seconds)} seconds",))]
+        conn.executemany('DELETE FROM artifacts WHERE id = ?', [(a,) for a in orphans])
+    return orphans
+
+# ==============================================================================
+# 🏗️ BACKGROUND JOBS
+# ==============================================================================
+def create_job(kind, payload):
+    """Queues a background job and returns its ID."""
+    with get_connection() as conn:
+        c = conn.execute('INSERT INTO jobs (kind, payload) VALUES (?, ?)', (kind, json.dumps(payload)))
+        return c.lastrowid
+
+def update_job(job_id, status=None, progress=None, error=None):
+    """Updates a job's status / progress; start and finish times are stamped automatically."""
+    with get_connection() as conn:
+        if status == "running":
+            conn.execute('UPDATE jobs SET status = ?, started_at = CURRENT_TIMESTAMP WHERE id = ?', (status, job_id))
+        elif status in ("done", "failed"):
+            conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?',
+                         (status, error, job_id))
+        elif status:
+            conn.execute('UPDATE jobs SET status = ? WHERE id = ?', (status, job_id))
+        if progress is not None:
+            conn.execute('UPDATE jobs SET progress = ? WHERE id = ?', (json.dumps(progress), job_id))
+
+def _job_row(row):
+    job_id, kind, payload, status, progress, error, created_at, started_at, finished_at = row
+    return {
+        "id": job_id, "kind": kind, "payload": json.loads(payload) if payload else None,
+        "status": status, "progress": json.loads(progress) if progress else {},
+        "error": error, "created_at": created_at, "started_at": started_at, "finished_at": finished_at,
+    }
+
+def get_job(job_id):
+    with get_connection() as conn:
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return _job_row(row) if row else None
+
+def get_unfinished_jobs(kind=None):
+    """Returns queued/running jobs, oldest first."""
+    query = "SELECT * FROM jobs WHERE status IN ('queued', 'running')"
+    params = ()
+    if kind:
+        query += ' AND kind = ?'
+        params = (kind,)
+    with get_connection() as conn:
+        rows = conn.execute(query + ' ORDER BY id ASC', params).fetchall()
+    return [_job_row(row) for row in rows]
+
 # Initialize immediately when imported
-init_db()
\ No newline at end of file
+init_db()
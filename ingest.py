@@ -1,5 +1,11 @@
 import os
 import glob
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, ALL_COMPLETED
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.document_loaders import (
@@ -10,91 +16,511 @@ from langchain_community.document_loaders import (
     CSVLoader     
 )
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from config import EMBEDDING_MODEL, EMBEDDING_CACHE_SIZE
+from cache import LRUCache
+import bm25
 
 # --- CONFIGURATION ---
 DATA_PATH = "data"
 DB_PATH = "vector_db"
 OLLAMA_URL = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
-BATCH_SIZE = 5
+LOADER_WORKERS = max(1, (os.cpu_count() or 2) - 1)   # Parallel file parsers
+KB_VERSION_FILE = os.path.join(DB_PATH, "kb_version.txt")
 
-def get_existing_files(vector_store):
-    """Asks the database: 'What files do you already have?'"""
+# --- EMBEDDING PIPELINE ---
+EMBED_BATCH_SIZE = 64           # Chunks per worker task / vector-store write
+EMBED_CONCURRENCY = 2           # Embedding requests in flight against Ollama at once
+CHECKPOINT_EVERY_CHUNKS = 2000  # Persist + checkpoint after this many new chunks...
+CHECKPOINT_EVERY_SECONDS = 60   # ...or this many seconds, whichever comes first
+CHECKPOINT_FILE = os.path.join(DB_PATH, "ingest_checkpoint.json")
+MANIFEST_FILE = os.path.join(DB_PATH, "manifest.json")
+
+# --- KB VERSIONING ---
+# Every chunk carries kb_version (first version it's part of) and kb_retired (first
+# version it's not). A run writes at the next version and only retires old chunks,
+# so chat keeps reading the published version until _bump_kb_version() switches it.
+VERSIONED_MARKER = os.path.join(DB_PATH, "chunks_versioned")   # Written once legacy chunks are stamped
+CHROMA_BATCH = 5000             # IDs per metadata get/update call
+
+# ==============================================================================
+# 🔌 SHARED VECTOR STORE (One handle per process, shared by all sessions)
+# ==============================================================================
+_store_lock = threading.Lock()
+_shared_store = {"version": None, "db": None}
+_embeddings = None
+
+def get_embeddings():
+    """Returns the process-wide Ollama embedding client."""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL, base_url=OLLAMA_URL)
+    return _embeddings
+
+_query_embeddings = LRUCache(EMBEDDING_CACHE_SIZE)
+
+def normalize_query(text):
+    """Lowercases and collapses whitespace so trivially different queries share a cache entry."""
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+def embed_query(text):
+    """
+    Embeds a search query, reusing the vector for repeated questions. The
+    normalized text is only the cache key; the model always sees the query as typed.
+    """
+    key = normalize_query(text)
+    vector = _query_embeddings.get(key)
+    if vector is None:
+        vector = get_embeddings().embed_query(text)
+        _query_embeddings.put(key, vector)
+    return vector
+
+def get_embedding_cache_stats():
+    return _query_embeddings.stats()
+
+def get_kb_version():
+    """Reads the knowledge-base version counter (bumped after every ingestion that writes chunks)."""
+    try:
+        with open(KB_VERSION_FILE, "r") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def _bump_kb_version():
+    version = get_kb_version() + 1
+    os.makedirs(DB_PATH, exist_ok=True)
+    tmp_path = KB_VERSION_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(version))
+    os.replace(tmp_path, KB_VERSION_FILE)
+    return version
+
+def get_vector_store():
+    """
+    Returns the shared Chroma handle, opening it only on first use
+    or when ingest() has written a new knowledge-base version.
+    """
+    if not os.path.exists(DB_PATH):
+        return None
+    version = get_kb_version()
+    with _store_lock:
+        if _shared_store["db"] is None or _shared_store["version"] != version:
+            print(f"🔌 Opening vector store (KB version {version})...")
+            _shared_store["db"] = Chroma(persist_directory=DB_PATH, embedding_function=get_embeddings())
+            _shared_store["version"] = version
+            stamp_unversioned_chunks(_shared_store["db"])
+        return _shared_store["db"]
+
+def chunk_id(doc):
+    """Stable ID for a chunk, derived from where it came from and what it says."""
+    meta = doc.metadata or {}
+    key = f"{meta.get('source')}|{meta.get('page')}|{meta.get('start_index')}|{doc.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def load_file(file_path):
+    """Parses a single file into documents. Runs inside a loader worker process."""
+    ext = os.path.splitext(file_path)[1].lower()
+    loader = None
+    if ext == ".pdf":
+        print(f"   - Loading PDF: {file_path}")
+        loader = PyPDFLoader(file_path)
+    elif ext == ".docx":
+        print(f"   - Loading Word: {file_path}")
+        loader = Docx2txtLoader(file_path)
+    elif ext == ".pptx":
+        print(f"   - Loading PPT: {file_path}")
+        loader = UnstructuredPowerPointLoader(file_path)
+    elif ext == ".txt":
+        print(f"   - Loading Text: {file_path}")
+        loader = TextLoader(file_path, encoding="utf-8")
+    elif ext == ".csv":
+        print(f"   - Loading CSV as Text: {file_path}")
+        loader = CSVLoader(file_path)    
+    
+    return loader.load() if loader else []
+
+def iter_documents(file_paths, workers=LOADER_WORKERS):
+    """
+    Parses files concurrently and yields (file_path, documents) as each one finishes.
+    A file that fails to parse is reported and skipped; the rest carry on.
+    """
+    if workers <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            try:
+                yield file_path, load_file(file_path)
+            except Exception as e:
+                print(f"❌ Error loading {file_path}: {e}")
+        return
+
+    # spawn, not fork: this runs on the ingest worker thread inside the Streamlit
+    # server, and forking a process with live threads can deadlock the children
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_paths)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(load_file, file_path): file_path for file_path in file_paths}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                yield file_path, future.result()
+            except Exception as e:
+                print(f"❌ Error loading {file_path}: {e}")
+
+# ==============================================================================
+# 📒 INGESTION MANIFEST (path -> size, mtime, content hash, chunk IDs)
+# ==============================================================================
+def file_hash(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_manifest(manifest):
+    os.makedirs(DB_PATH, exist_ok=True)
+    tmp_path = MANIFEST_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def _manifest_entry(file_path, sha256, chunk_ids):
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256, "chunk_ids": chunk_ids}
+
+def seed_manifest(vector_store):
+    """
+    One-time migration for vector stores built before the manifest existed:
+    groups the stored chunk IDs by source file.
+    """
+    manifest = {"files": {}}
     try:
         data = vector_store.get(include=['metadatas'])
-        existing_sources = set()
-        for meta in data['metadatas']:
-            if meta and 'source' in meta:
-                existing_sources.add(meta['source'])
-        return existing_sources
     except Exception:
-        return set() 
+        return manifest
+    for cid, meta in zip(data['ids'], data['metadatas']):
+        if meta and 'source' in meta:
+            source = os.path.normpath(meta['source'])
+            manifest["files"].setdefault(source, {"chunk_ids": []})["chunk_ids"].append(cid)
+    for source, entry in list(manifest["files"].items()):
+        if os.path.exists(source):
+            manifest["files"][source] = _manifest_entry(source, file_hash(source), entry["chunk_ids"])
+        else:
+            entry.update({"size": None, "mtime": None, "sha256": None})
+    print(f"📒 Built ingestion manifest for {len(manifest['files'])} existing files.")
+    return manifest
+
+def detect_changes(manifest, paths=None):
+    """
+    Compares files on disk with the manifest. Only hashes files whose size or
+    mtime changed, and never touches the vector store.
+    Returns (changed, deleted): {path: sha256} of new/modified files and a list of removed paths.
+    """
+    files = manifest["files"]
+    if paths is None:
+        candidates = [os.path.normpath(p) for p in glob.glob(os.path.join(DATA_PATH, "*.*"))]
+        deleted = [p for p in files if not os.path.exists(p)]
+    else:
+        candidates = [os.path.normpath(p) for p in paths if os.path.exists(p)]
+        deleted = [os.path.normpath(p) for p in paths if not os.path.exists(p) and os.path.normpath(p) in files]
+
+    changed = {}
+    for file_path in candidates:
+        entry = files.get(file_path)
+        stat = os.stat(file_path)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+            continue
+        sha256 = file_hash(file_path)
+        if entry and entry.get("sha256") == sha256:
+            entry["mtime"] = stat.st_mtime   # Touched but not edited
+            continue
+        changed[file_path] = sha256
+    return changed, deleted
+
+# ==============================================================================
+# 💾 CHECKPOINTS (Resume an interrupted ingestion)
+# ==============================================================================
+def load_checkpoint():
+    """Returns the files of an interrupted run and the chunk IDs it already wrote."""
+    try:
+        with open(CHECKPOINT_FILE, "r") as f:
+            data = json.load(f)
+        return {"files": data.get("files", []), "done_ids": set(data.get("done_ids", []))}
+    except (OSError, ValueError):
+        return {"files": [], "done_ids": set()}
+
+def save_checkpoint(checkpoint):
+    os.makedirs(DB_PATH, exist_ok=True)
+    tmp_path = CHECKPOINT_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"files": checkpoint["files"], "done_ids": sorted(checkpoint["done_ids"])}, f)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+def clear_checkpoint():
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+
+# ==============================================================================
+# 🏷️ KB VERSIONS (What chat sees while an ingestion is running)
+# ==============================================================================
+def visible_filter(version):
+    """Chroma `where` clause selecting the chunks that make up KB version `version`."""
+    return {"$and": [{"kb_version": {"$lte": version}}, {"kb_retired": {"$gt": version}}]}
+
+def stamp_unversioned_chunks(vector_store):
+    """
+    One-time migration for vector stores built before versioning: marks every
+    existing chunk as part of all versions, so visible_filter() keeps finding them.
+    """
+    if os.path.exists(VERSIONED_MARKER):
+        return
+    data = vector_store._collection.get(include=["metadatas"])
+    missing = [(cid, meta or {}) for cid, meta in zip(data["ids"], data["metadatas"])
+               if "kb_version" not in (meta or {})]
+    for start in range(0, len(missing), CHROMA_BATCH):
+        batch = missing[start:start + CHROMA_BATCH]
+        vector_store._collection.update(
+            ids=[cid for cid, _ in batch],
+            metadatas=[{**meta, "kb_version": 0, "kb_retired": bm25.NEVER_RETIRED} for _, meta in batch],
+        )
+    with open(VERSIONED_MARKER, "w") as f:
+        f.write("1")
+    if missing:
+        print(f"🏷️ Stamped {len(missing)} existing chunks with a KB version.")
+
+def _retire(vector_store, chunk_ids, version):
+    """Hides chunks from KB version `version` on; readers of older versions still see them."""
+    chunk_ids = list(chunk_ids)
+    for start in range(0, len(chunk_ids), CHROMA_BATCH):
+        data = vector_store._collection.get(ids=chunk_ids[start:start + CHROMA_BATCH], include=["metadatas"])
+        if data["ids"]:
+            vector_store._collection.update(
+                ids=data["ids"],
+                metadatas=[{**(meta or {}), "kb_retired": version} for meta in data["metadatas"]],
+            )
+
+def _purge_retired(vector_store, version):
+    """Deletes the chunks retired at or before the published `version` (nobody can see them)."""
+    vector_store._collection.delete(where={"kb_retired": {"$lte": version}})
+    bm25.purge_retired(version)
+
+def _publish(vector_store, manifest, version):
+    """
+    Switches readers to `version`, then records the run and drops what it retired.
+    The bump comes first: if we stop right after it, the next run just redoes the
+    bookkeeping, whereas a saved manifest with no bump would hide the new chunks for good.
+    """
+    vector_store.persist()
+    _bump_kb_version()
+    save_manifest(manifest)
+    clear_checkpoint()
+    _purge_retired(vector_store, version)
+
+# ==============================================================================
+# 🧠 EMBEDDING PIPELINE
+# ==============================================================================
+class EmbeddingPipeline:
+    """
+    Embeds chunks on EMBED_CONCURRENCY worker threads. OllamaEmbeddings still
+    sends one request per text, so the speed-up comes from keeping several
+    requests in flight, not from batching. Writes happen on the calling thread;
+    persistence and the resume checkpoint only happen every few thousand chunks / seconds.
+    """
+
+    def __init__(self, vector_store, checkpoint, kb_version, on_write=None):
+        self.vector_store = vector_store
+        self.checkpoint = checkpoint
+        self.kb_version = kb_version
+        self.on_write = on_write
+        self.pending = []
+        self.in_flight = set()
+        self.pool = ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix="embed")
+        self.written = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self.last_checkpoint_time = self.started
+        self.last_checkpoint_count = 0
+
+    def add(self, chunks, unchanged=()):
+        """Queues chunks for embedding, skipping those already stored (`unchanged` IDs or checkpointed)."""
+        already_done = []
+        for chunk in chunks:
+            cid = chunk_id(chunk)
+            if cid in unchanged:
+                # Same text at the same position: the stored chunk stays as it is
+                self.skipped += 1
+                continue
+            chunk.metadata.update(kb_version=self.kb_version, kb_retired=bm25.NEVER_RETIRED)
+            if cid in self.checkpoint["done_ids"]:
+                already_done.append((cid, chunk))
+                continue
+            self.pending.append((cid, chunk))
+        if already_done:
+            # Embedded before the interruption; the keyword index may predate that run's writes
+            bm25.add_chunks(already_done)
+            self.skipped += len(already_done)
+        while len(self.pending) >= EMBED_BATCH_SIZE:
+            batch, self.pending = self.pending[:EMBED_BATCH_SIZE], self.pending[EMBED_BATCH_SIZE:]
+            self._submit(batch)
+
+    def finish(self):
+        """Flushes everything, persists once and returns throughput stats."""
+        if self.pending:
+            self._submit(self.pending)
+            self.pending = []
+        if self.in_flight:
+            self._collect(ALL_COMPLETED)
+        self.pool.shutdown()
+        self._checkpoint()
+        return self.stats()
+
+    def stats(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "chunks": self.written,
+            "skipped": self.skipped,
+            "seconds": seconds,
+            "chunks_per_second": self.written / seconds if seconds else 0.0,
+        }
+
+    def _submit(self, batch):
+        # Bounded concurrency: wait for a slot before sending another batch
+        while len(self.in_flight) >= EMBED_CONCURRENCY:
+            self._collect(FIRST_COMPLETED)
+        self.in_flight.add(self.pool.submit(self._embed, batch))
+
+    @staticmethod
+    def _embed(batch):
+        return batch, get_embeddings().embed_documents([chunk.page_content for _, chunk in batch])
+
+    def _collect(self, return_when):
+        done, _ = wait(self.in_flight, return_when=return_when)
+        for future in done:
+            self.in_flight.remove(future)
+            batch, vectors = future.result()
+            self._write(batch, vectors)
+        if (self.written - self.last_checkpoint_count >= CHECKPOINT_EVERY_CHUNKS
+                or time.perf_counter() - self.last_checkpoint_time >= CHECKPOINT_EVERY_SECONDS):
+            self._checkpoint()
+
+    def _write(self, batch, vectors):
+        ids = [cid for cid, _ in batch]
+        self.vector_store._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            metadatas=[chunk.metadata for _, chunk in batch],
+            documents=[chunk.page_content for _, chunk in batch],
+        )
+        bm25.add_chunks(batch)
+        self.checkpoint["done_ids"].update(ids)
+        self.written += len(batch)
+        if self.on_write:
+            self.on_write(self.written)
+
+    def _checkpoint(self):
+        self.vector_store.persist()
+        save_checkpoint(self.checkpoint)
+        self.last_checkpoint_time = time.perf_counter()
+        self.last_checkpoint_count = self.written
+        stats = self.stats()
+        print(f"   💾 Checkpoint: {stats['chunks']} chunks embedded "
+              f"({stats['chunks_per_second']:.1f} chunks/s)")
+
+def backfill_keyword_index(vector_store):
+    """Builds the BM25 index for chunks that were embedded before it existed."""
+    data = vector_store.get(include=['documents', 'metadatas'])
+    docs = [Document(page_content=text, metadata=meta or {}) for text, meta in zip(data['documents'], data['metadatas'])]
+    bm25.add_chunks([(chunk_id(doc), doc) for doc in docs])
+    print(f"🔎 Built keyword index for {len(docs)} existing chunks.")
+
+def ingest(paths=None, workers=LOADER_WORKERS, progress=None):
+    """
+    Brings the vector store in line with the files on disk.
+    By default scans DATA_PATH (new, modified and deleted files);
+    pass `paths` to ingest just those files (e.g. a single upload).
+    `progress` is called with a dict of counters as files are parsed and chunks embedded.
+    """
+    status = {"stage": "scanning", "files_total": 0, "files_done": 0, "chunks_total": 0, "chunks_done": 0}
+    def report(**fields):
+        status.update(fields)
+        if progress:
+            progress(dict(status))
 
-def load_documents(existing_files):
-    documents = []
-    all_files = glob.glob(os.path.join(DATA_PATH, "*.*"))
-    new_files = [f for f in all_files if f not in existing_files]
-    
-    if not new_files:
-        return []
-
-    print(f"📂 Found {len(new_files)} NEW files to process...")
-
-    for file_path in new_files:
-        ext = os.path.splitext(file_path)[1].lower()
-        loader = None
-        try:
-            if ext == ".pdf":
-                print(f"   - Loading PDF: {file_path}")
-                loader = PyPDFLoader(file_path)
-            elif ext == ".docx":
-                print(f"   - Loading Word: {file_path}")
-                loader = Docx2txtLoader(file_path)
-            elif ext == ".pptx":
-                print(f"   - Loading PPT: {file_path}")
-                loader = UnstructuredPowerPointLoader(file_path)
-            elif ext == ".txt":
-                print(f"   - Loading Text: {file_path}")
-                loader = TextLoader(file_path, encoding="utf-8")
-            elif ext == ".csv":
-                print(f"   - Loading CSV as Text: {file_path}")
-                loader = CSVLoader(file_path)    
-            
-            if loader:
-                documents.extend(loader.load())
-        except Exception as e:
-            print(f"❌ Error loading {file_path}: {e}")
-            
-    return documents
-
-def ingest():
     print("🚀 STARTING INCREMENTAL INGESTION...")
-    embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url=OLLAMA_URL)
-    
     # 1. Connect to Existing DB
-    vector_store = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
+    vector_store = Chroma(persist_directory=DB_PATH, embedding_function=get_embeddings())
+    stamp_unversioned_chunks(vector_store)
+    # Chat keeps reading the published version; everything below is written at the next one
+    pending_version = get_kb_version() + 1
+    _purge_retired(vector_store, pending_version - 1)   # Left over if the last run stopped right after publishing
+    manifest = load_manifest() or seed_manifest(vector_store)
+    if manifest["files"] and bm25.is_empty():
+        backfill_keyword_index(vector_store)
     
-    # 2. Check & Load
-    existing_files = get_existing_files(vector_store)
-    raw_docs = load_documents(existing_files)
+    # 2. Check what changed (an interrupted run's files were never recorded, so they show up again)
+    checkpoint = load_checkpoint()
+    if checkpoint["done_ids"]:
+        print(f"♻️ Resuming interrupted ingestion ({len(checkpoint['done_ids'])} chunks already embedded)...")
+    changed, deleted = detect_changes(manifest, paths)
+
+    # 3. Retire deleted files (still answered from until the new version is published)
+    for file_path in deleted:
+        chunk_ids = manifest["files"].pop(file_path)["chunk_ids"]
+        _retire(vector_store, chunk_ids, pending_version)
+        bm25.retire_source(file_path, pending_version)
+        print(f"🗑️ Removed {file_path} ({len(chunk_ids)} chunks)")
     
-    if not raw_docs:
+    if not changed:
+        if deleted:
+            _publish(vector_store, manifest, pending_version)
+            return {"files": 0, "deleted": len(deleted), "chunks": 0, "skipped": 0,
+                    "seconds": 0.0, "chunks_per_second": 0.0}
+        save_manifest(manifest)
+        clear_checkpoint()
         print("✅ System is up to date. No new files to digest.")
-        return
+        return None
+
+    checkpoint["files"] = sorted(set(checkpoint["files"]) | set(changed))
+    save_checkpoint(checkpoint)
+
+    # 4. Parse in parallel, then Split & Embed each file as soon as it's parsed
+    print(f"📂 Found {len(changed)} new/modified files to process ({workers} parallel loaders)...")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100, add_start_index=True)
+    report(stage="embedding", files_total=len(changed))
+    pipeline = EmbeddingPipeline(vector_store, checkpoint, pending_version,
+                                 on_write=lambda done: report(chunks_done=done + pipeline.skipped))
+    new_chunk_ids = {}
 
-    # 3. Split & Embed
-    print(f"🔪 Splitting {len(raw_docs)} new documents...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = text_splitter.split_documents(raw_docs)
-    total_chunks = len(chunks)
-    
     print("🧠 Embedding new data...")
-    for i in range(0, total_chunks, BATCH_SIZE):
-        batch = chunks[i : i + BATCH_SIZE]
-        vector_store.add_documents(batch)
-        vector_store.persist()
-        print(f"   ⏳ Added {min(i + BATCH_SIZE, total_chunks)}/{total_chunks} chunks...")
+    for file_path, docs in iter_documents(list(changed), workers):
+        chunks = text_splitter.split_documents(docs)
+        print(f"🔪 Split {file_path} into {len(chunks)} chunks")
+        new_chunk_ids[file_path] = [chunk_id(c) for c in chunks]
+        report(files_done=status["files_done"] + 1, chunks_total=status["chunks_total"] + len(chunks))
+        old_entry = manifest["files"].get(file_path)
+        pipeline.add(chunks, unchanged=set(old_entry["chunk_ids"]) if old_entry else set())
+
+    stats = pipeline.finish()
+    report(stage="finalizing")
+
+    # 5. Retire the old chunks of modified files, then publish the new version
+    for file_path, chunk_ids in new_chunk_ids.items():
+        old_entry = manifest["files"].get(file_path)
+        if old_entry:
+            _retire(vector_store, set(old_entry["chunk_ids"]) - set(chunk_ids), pending_version)
+        bm25.retire_source(file_path, pending_version, keep_ids=chunk_ids)
+        manifest["files"][file_path] = _manifest_entry(file_path, changed[file_path], chunk_ids)
+    stats.update({"files": len(new_chunk_ids), "deleted": len(deleted)})
 
-    print("✅ SUCCESS! Knowledge Base Updated.")
+    # Every open session switches to the new version (and reloads its vector store handle)
+    _publish(vector_store, manifest, pending_version)
+    print(f"✅ SUCCESS! Knowledge Base Updated: {stats['files']} files, {stats['chunks']} chunks "
+          f"in {stats['seconds']:.1f}s ({stats['chunks_per_second']:.1f} chunks/s).")
+    return stats
 
 if __name__ == "__main__":
     ingest()
\ No newline at end of file
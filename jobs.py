@@ -0,0 +1,88 @@
+import time
+import queue
+import threading
+import db
+import ingest
+
+# ==============================================================================
+# 🏗️ BACKGROUND JOBS: Ingestion runs off the Streamlit script thread
+# ==============================================================================
+# A single worker thread means ingest requests against vector_db are serialized.
+# Chunks are written at the next KB version and old ones are only retired, so chat
+# keeps answering from the published version until the bump at the end of a job.
+PROGRESS_INTERVAL = 1.0   # Seconds between progress writes to the job table
+
+_queue = queue.Queue()
+_worker = {"thread": None}
+_worker_lock = threading.Lock()
+
+def _ensure_worker():
+    with _worker_lock:
+        if _worker["thread"] is None or not _worker["thread"].is_alive():
+            # Jobs left queued/running by a previous process are picked up again
+            # (ingestion resumes from its checkpoint)
+            for job in db.get_unfinished_jobs("ingest"):
+                db.update_job(job["id"], status="queued")
+                _queue.put(job["id"])
+            thread = threading.Thread(target=_run_worker, name="ingest-worker", daemon=True)
+            thread.start()
+            _worker["thread"] = thread
+
+def start():
+    """Starts the worker at app startup, so jobs interrupted by a restart resume right away."""
+    _ensure_worker()
+
+def submit_ingest(paths=None):
+    """Queues an ingestion job and returns its ID immediately."""
+    _ensure_worker()
+    job_id = db.create_job("ingest", {"paths": paths})
+    _queue.put(job_id)
+    return job_id
+
+def _run_worker():
+    while True:
+        job_id = _queue.get()
+        job = db.get_job(job_id)
+        if job is None or job["status"] in ("done", "failed"):
+            continue
+        _run_ingest_job(job)
+
+def _run_ingest_job(job):
+    job_id = job["id"]
+    db.update_job(job_id, status="running")
+    started = time.time()
+    last_write = {"at": 0.0}
+
+    def on_progress(status):
+        now = time.time()
+        if now - last_write["at"] >= PROGRESS_INTERVAL:
+            last_write["at"] = now
+            db.update_job(job_id, progress={**status, "elapsed": now - started})
+
+    try:
+        stats = ingest.ingest(job["payload"].get("paths"), progress=on_progress) or {}
+        db.update_job(job_id, status="done", progress={**stats, "stage": "done", "elapsed": time.time() - started})
+    except Exception as e:
+        print(f"❌ Ingest job {job_id} failed: {e}")
+        db.update_job(job_id, status="failed", error=str(e))
+
+def get_job(job_id):
+    return db.get_job(job_id)
+
+def get_active_jobs():
+    return db.get_unfinished_jobs("ingest")
+
+def estimate_eta(progress):
+    """
+    Seconds left, extrapolated from the chunk rate so far.
+    The chunk total is only known for parsed files, so it is scaled up to all files.
+    """
+    files_total = progress.get("files_total") or 0
+    files_done = progress.get("files_done") or 0
+    chunks_done = progress.get("chunks_done") or 0
+    elapsed = progress.get("elapsed") or 0
+    if not files_done or not chunks_done or not elapsed:
+        return None
+    expected_chunks = progress.get("chunks_total", 0) * files_total / files_done
+    rate = chunks_done / elapsed
+    return max(expected_chunks - chunks_done, 0) / rate
@@ -0,0 +1,270 @@
+import json
+import math
+import sqlite3
+import threading
+import ingest
+import bm25
+from cache import LRUCache
+from config import (
+    CURRENT_CONFIG, CACHE_DB, RETRIEVAL_CACHE_SIZE, ANSWER_CACHE_MAX_DISTANCE, ANSWER_CACHE_MAX_ENTRIES,
+    HYBRID_FETCH_K, RRF_K, RERANKER_MODEL
+)
+
+# ==============================================================================
+# ⚖️ LEGAL DEPT: Cached retrieval over the knowledge base
+# ==============================================================================
+_retrieval_cache = LRUCache(RETRIEVAL_CACHE_SIZE)
+_cache_version = {"kb": None}
+_version_lock = threading.Lock()
+
+def _sync_kb_version():
+    """Drops every cached result as soon as ingest() publishes a new KB version."""
+    version = ingest.get_kb_version()
+    with _version_lock:
+        if _cache_version["kb"] != version:
+            _retrieval_cache.clear()
+            _cache_version["kb"] = version
+    return version
+
+def retrieve(query, k=3):
+    """
+    Returns the top-k chunks for the query, or None if the vector DB doesn't exist.
+    Both the query embedding and the search result are cached.
+    """
+    version = _sync_kb_version()
+    vector = ingest.embed_query(query)
+    key = (tuple(vector), k, version)
+
+    results = _retrieval_cache.get(key)
+    if results is None:
+        legal_db = ingest.get_vector_store()
+        if legal_db is None:
+            return None
+        results = hybrid_search(legal_db, query, vector, k, version)
+        _retrieval_cache.put(key, results)
+    return results
+
+def hybrid_search(legal_db, query, vector, k, kb_version):
+    """
+    Fuses vector and BM25 rankings with Reciprocal Rank Fusion,
+    then optionally reranks the fused candidates with a local cross-encoder.
+    Only chunks of the published kb_version are searched, not those of a running ingestion.
+    """
+    fetch_k = max(HYBRID_FETCH_K, k)
+    vector_docs = legal_db.similarity_search_by_vector(vector, k=fetch_k, filter=ingest.visible_filter(kb_version))
+    keyword_hits = bm25.search(query, k=fetch_k, kb_version=kb_version)
+
+    docs = {}
+    fused = {}
+    for rank, doc in enumerate(vector_docs):
+        cid = ingest.chunk_id(doc)
+        docs[cid] = doc
+        fused[cid] = fused.get(cid, 0.0) + 1.0 / (RRF_K + rank + 1)
+    for rank, (cid, _) in enumerate(keyword_hits):
+        fused[cid] = fused.get(cid, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    # Keyword-only hits aren't in the vector results; load their text from the index
+    docs.update(bm25.get_documents([cid for cid in fused if cid not in docs]))
+    ranked = [docs[cid] for cid in sorted(fused, key=fused.get, reverse=True) if cid in docs]
+
+    reranker = get_reranker()
+    if reranker is not None and len(ranked) > k:
+        scores = reranker.predict([(query, doc.page_content) for doc in ranked])
+        ranked = [doc for _, doc in sorted(zip(scores, ranked), key=lambda pair: pair[0], reverse=True)]
+    return ranked[:k]
+
+_reranker = {"model": None, "loaded": False}
+_reranker_lock = threading.Lock()
+
+def get_reranker():
+    """Loads the optional cross-encoder once; returns None when disabled or unavailable."""
+    if not RERANKER_MODEL:
+        return None
+    with _reranker_lock:
+        if not _reranker["loaded"]:
+            _reranker["loaded"] = True
+            try:
+                from sentence_transformers import CrossEncoder
+                _reranker["model"] = CrossEncoder(RERANKER_MODEL, device="cpu")
+            except Exception as e:
+                print(f"⚠️ Reranker unavailable, using fused ranking only: {e}")
+        return _reranker["model"]
+
+def get_cache_stats():
+    """Hit/miss counters for the embedding and retrieval caches."""
+    return {
+        "embeddings": ingest.get_embedding_cache_stats(),
+        "retrieval": _retrieval_cache.stats(),
+    }
+
+# ==============================================================================
+# 📦 CONTEXT PACKING (Fewer prompt tokens for the CPU-bound model)
+# ==============================================================================
+NEAR_DUPLICATE_OVERLAP = 0.8   # Drop a passage if this share of its 5-word shingles is already in the context
+MAX_TEXT_OVERLAP = 300         # Longest suffix/prefix overlap looked for when start_index is missing
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+def count_tokens(text):
+    """Exact with tiktoken installed, otherwise the usual ~4 characters per token estimate."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+def _text_overlap(left, right):
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    for size in range(min(len(left), len(right), MAX_TEXT_OVERLAP), 20, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+def _merge_adjacent(results):
+    """
+    Stitches chunks of the same source/page back together when they touch or overlap,
+    so the splitter's chunk_overlap isn't sent twice. Returns [(rank, text)].
+    """
+    groups = {}
+    for rank, doc in enumerate(results):
+        meta = doc.metadata or {}
+        groups.setdefault((meta.get("source"), meta.get("page")), []).append((rank, doc))
+
+    passages = []
+    for members in groups.values():
+        members.sort(key=lambda item: (item[1].metadata or {}).get("start_index", 0))
+        rank, doc = members[0]
+        text = doc.page_content
+        end = (doc.metadata or {}).get("start_index")
+        end = end + len(text) if end is not None else None
+        for next_rank, next_doc in members[1:]:
+            start = (next_doc.metadata or {}).get("start_index")
+            next_text = next_doc.page_content
+            if end is not None and start is not None and start <= end:
+                text += next_text[end - start:]
+            elif _text_overlap(text, next_text):
+                text += next_text[_text_overlap(text, next_text):]   # No start_index (older chunks)
+            else:
+                passages.append((rank, text))
+                rank, text = next_rank, next_text
+            rank = min(rank, next_rank)
+            end = start + len(next_text) if start is not None else None
+        passages.append((rank, text))
+    return sorted(passages)
+
+def _shingles(text):
+    words = text.lower().split()
+    return {" ".join(words[i:i + 5]) for i in range(max(len(words) - 4, 1))}
+
+def pack_context(results, token_budget=None):
+    """
+    Builds the RAG context: merges adjacent/overlapping chunks, drops near-duplicates
+    and fills up to the model's token budget in relevance order.
+    """
+    if token_budget is None:
+        token_budget = CURRENT_CONFIG["context_token_budget"]
+    naive_tokens = count_tokens("\n".join(doc.page_content for doc in results))
+
+    kept, kept_shingles, used = [], [], 0
+    for _, text in _merge_adjacent(results):
+        shingles = _shingles(text)
+        if any(len(shingles & seen) / min(len(shingles), len(seen)) >= NEAR_DUPLICATE_OVERLAP for seen in kept_shingles):
+            continue
+        tokens = count_tokens(text)
+        if used + tokens > token_budget:
+            if not kept:
+                # Even the best passage is too long: keep its head
+                text = text[:token_budget * len(text) // tokens]
+                kept.append(text)
+                used = count_tokens(text)
+            continue
+        kept.append(text)
+        kept_shingles.append(shingles)
+        used += tokens
+
+    context = "\n---\n".join(kept)
+    print(f"📦 Packed context: {used} tokens (naive {naive_tokens}, saved {max(naive_tokens - used, 0)})")
+    return context
+
+# ==============================================================================
+# 💡 SEMANTIC ANSWER CACHE (Persistent, survives restarts)
+# ==============================================================================
+def init_answer_cache():
+    """Creates the answer cache table if it doesn't exist."""
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kb_version INTEGER,
+            chunk_key TEXT,
+            query TEXT,
+            embedding TEXT,
+            answer TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_answer_lookup ON answer_cache (kb_version, chunk_key)')
+    conn.commit()
+    conn.close()
+
+def _chunk_key(results):
+    """The answer only depends on the context, so the exact set of chunk IDs is part of the key."""
+    return ",".join(sorted(ingest.chunk_id(doc) for doc in results))
+
+def _cosine_distance(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return 1.0 - (dot / norm if norm else 0.0)
+
+def lookup_answer(query, results):
+    """Returns a stored answer for a near-identical question over the same chunks, else None."""
+    if not results:
+        return None
+    vector = ingest.embed_query(query)
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    c.execute('SELECT id, embedding, answer FROM answer_cache WHERE kb_version = ? AND chunk_key = ?',
+              (ingest.get_kb_version(), _chunk_key(results)))
+    best = None
+    for entry_id, embedding, answer in c.fetchall():
+        distance = _cosine_distance(vector, json.loads(embedding))
+        if distance <= ANSWER_CACHE_MAX_DISTANCE and (best is None or distance < best[0]):
+            best = (distance, entry_id, answer)
+    if best:
+        c.execute('UPDATE answer_cache SET last_used_at = CURRENT_TIMESTAMP WHERE id = ?', (best[1],))
+        conn.commit()
+    conn.close()
+    return best[2] if best else None
+
+def store_answer(query, results, answer):
+    """Saves a finished answer, dropping stale KB versions and the least recently used overflow."""
+    if not results or not answer or "❌" in answer:
+        return
+    version = ingest.get_kb_version()
+    conn = sqlite3.connect(CACHE_DB)
+    c = conn.cursor()
+    c.execute('INSERT INTO answer_cache (kb_version, chunk_key, query, embedding, answer) VALUES (?, ?, ?, ?, ?)',
+              (version, _chunk_key(results), query, json.dumps(ingest.embed_query(query)), answer))
+    c.execute('DELETE FROM answer_cache WHERE kb_version != ?', (version,))
+    c.execute('''
+        DELETE FROM answer_cache WHERE id NOT IN (
+            SELECT id FROM answer_cache ORDER BY last_used_at DESC, id DESC LIMIT ?
+        )
+    ''', (ANSWER_CACHE_MAX_ENTRIES,))
+    conn.commit()
+    conn.close()
+
+def remember_answer(query, results, stream):
+    """Passes tokens through untouched and stores the full answer once the stream finishes."""
+    tokens = []
+    for token in stream:
+        tokens.append(token)
+        yield token
+    store_answer(query, results, "".join(tokens))
+
+# Initialize immediately when imported
+init_answer_cache()
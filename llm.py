@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from contextlib import contextmanager
+import httpx
+from config import (
+    LLM_CONNECT_TIMEOUT, LLM_TIMEOUT_SECONDS, LLM_RETRIES, LLM_RETRY_BACKOFF,
+    LLM_MAX_CONNECTIONS, LLM_DEFAULT_CONCURRENCY, LLM_MODEL_CONCURRENCY,
+    LLM_QUEUE_TIMEOUT, LLM_METRICS_WINDOW
+)
+
+# ==============================================================================
+# 🚦 LLM GATEWAY: One client, one queue per model, one request per prompt
+# ==============================================================================
+# Talks to Ollama's /api/chat directly over a pooled keep-alive connection.
+# Identical prompts that are already in flight attach to the running request
+# and read the same tokens instead of generating them twice.
+OLLAMA_URL = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
+DEFAULT_OPTIONS = {"num_gpu": 0}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    """A model call failed (after retries), timed out, or never got a slot."""
+
+class _RetryableStatus(Exception):
+    pass
+
+_lock = threading.Lock()
+_client = {"instance": None}
+_semaphores = {}
+_inflight = {}
+_metrics = deque(maxlen=LLM_METRICS_WINDOW)
+_coalesced = {"count": 0}
+
+def get_client():
+    with _lock:
+        if _client["instance"] is None:
+            _client["instance"] = httpx.Client(
+                base_url=OLLAMA_URL,
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=LLM_MAX_CONNECTIONS)
+            )
+        return _client["instance"]
+
+@contextmanager
+def _model_slot(model):
+    """Waits for one of the model's concurrency slots. Yields the seconds spent queueing."""
+    with _lock:
+        if model not in _semaphores:
+            _semaphores[model] = threading.BoundedSemaphore(
+                LLM_MODEL_CONCURRENCY.get(model, LLM_DEFAULT_CONCURRENCY))
+        slot = _semaphores[model]
+    started = time.perf_counter()
+    if not slot.acquire(timeout=LLM_QUEUE_TIMEOUT):
+        raise LLMError(f"{model} is busy (no slot after {LLM_QUEUE_TIMEOUT}s)")
+    try:
+        yield time.perf_counter() - started
+    finally:
+        slot.release()
+
+def _post(model, messages, options, on_token):
+    """
+    Streams one /api/chat request, retrying connection errors and 5xx responses
+    as long as no token has been handed out yet. Returns Ollama's final chunk
+    (which carries prompt_eval_count / eval_count).
+    """
+    payload = {"model": model, "messages": messages, "stream": True,
+               "options": {**DEFAULT_OPTIONS, **(options or {})}}
+    for attempt in range(LLM_RETRIES + 1):
+        emitted = False
+        try:
+            with get_client().stream("POST", "/api/chat", json=payload) as response:
+                if response.status_code in RETRY_STATUSES:
+                    raise _RetryableStatus(f"HTTP {response.status_code}")
+                if response.status_code >= 400:
+                    response.read()
+                    raise LLMError(f"{model}: HTTP {response.status_code} {response.text[:200]}")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise LLMError(f"{model}: {chunk['error']}")
+                    token = chunk.get("message", {}).get("content")
+                    if token:
+                        emitted = True
+                        on_token(token)
+                    if chunk.get("done"):
+                        return chunk
+            raise LLMError(f"{model}: stream ended before the answer was done")
+        except (httpx.TransportError, _RetryableStatus) as e:
+            if emitted or attempt == LLM_RETRIES:
+                raise LLMError(f"{model}: {type(e).__name__}: {e}") from e
+            time.sleep(LLM_RETRY_BACKOFF * 2 ** attempt)
+
+class _Call:
+    """One upstream request; every caller with the same prompt reads its token buffer."""
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self._changed = threading.Condition()
+
+    def push(self, token):
+        with self._changed:
+            self.tokens.append(token)
+            self._changed.notify_all()
+
+    def finish(self, error=None):
+        with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    def iter_tokens(self):
+        position = 0
+        while True:
+            with self._changed:
+                while position >= len(self.tokens) and not self.done:
+                    self._changed.wait()
+                pending = self.tokens[position:]
+                position = len(self.tokens)
+                if not pending:
+                    if self.error:
+                        raise self.error
+                    return
+            yield from pending
+
+def _run(call, key, model, messages, options):
+    record = {"model": model, "ok": False, "queued_s": 0.0,
+              "prompt_eval_count": None, "eval_count": None, "error": None}
+    started = time.perf_counter()
+    try:
+        with _model_slot(model) as queued:
+            record["queued_s"] = queued
+            final = _post(model, messages, options, call.push)
+        record.update(ok=True, prompt_eval_count=final.get("prompt_eval_count"),
+                      eval_count=final.get("eval_count"))
+        call.finish()
+    except Exception as e:
+        record["error"] = str(e)
+        call.finish(e if isinstance(e, LLMError) else LLMError(f"{model}: {e}"))
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        record["latency_s"] = time.perf_counter() - started
+        _metrics.append(record)
+        print(f"🚦 {model}: {record['latency_s']:.2f}s (queued {record['queued_s']:.2f}s), "
+              f"{record['prompt_eval_count']} prompt + {record['eval_count']} output tokens"
+              + (f", failed: {record['error']}" if record["error"] else ""))
+
+def _start(model, messages, options):
+    key = hashlib.sha256(json.dumps([model, messages, options], sort_keys=True).encode("utf-8")).hexdigest()
+    with _lock:
+        call = _inflight.get(key)
+        if call is not None:
+            _coalesced["count"] += 1
+            return call
+        call = _inflight[key] = _Call()
+    threading.Thread(target=_run, args=(call, key, model, messages, options),
+                     daemon=True, name=f"llm-{model}").start()
+    return call
+
+def stream_chat(model, messages, options=None):
+    """
+    Starts (or joins) the request right away and returns a generator of answer
+    tokens. Raises LLMError from the generator if the call fails.
+    """
+    return _start(model, messages, options).iter_tokens()
+
+def chat(model, messages, options=None):
+    """Returns the full answer text. Raises LLMError if the call fails."""
+    return "".join(_start(model, messages, options).iter_tokens())
+
+def get_metrics():
+    """Per-model summary of the recent calls, plus how many requests were coalesced."""
+    summary = {}
+    for record in list(_metrics):
+        stats = summary.setdefault(record["model"], {
+            "calls": 0, "errors": 0, "latency_s": 0.0, "queued_s": 0.0,
+            "prompt_tokens": 0, "output_tokens": 0,
+        })
+        stats["calls"] += 1
+        stats["errors"] += 0 if record["ok"] else 1
+        stats["latency_s"] += record["latency_s"]
+        stats["queued_s"] += record["queued_s"]
+        stats["prompt_tokens"] += record["prompt_eval_count"] or 0
+        stats["output_tokens"] += record["eval_count"] or 0
+    for stats in summary.values():
+        stats["avg_latency_s"] = stats.pop("latency_s") / stats["calls"]
+        stats["avg_queued_s"] = stats.pop("queued_s") / stats["calls"]
+    return {"models": summary, "coalesced": _coalesced["count"]}
@@ -1,45 +1,176 @@
-import os
-from litellm import completion
-from config import CURRENT_CONFIG
+import re
+import math
+import threading
+import llm
+from config import CURRENT_CONFIG, ROUTER_CONFIDENCE_THRESHOLD
+from ingest import get_embeddings, embed_query
 
-def route_query(query):
+# ==============================================================================
+# ⚡ STAGE 1: KEYWORD RULES (Microseconds)
+# ==============================================================================
+DATA_RULE = re.compile(
+    r"\b(plot|graph|chart|csv|histogram|heatmap|scatter|visuali[sz]e|dataset|dataframe)s?\b",
+    re.IGNORECASE
+)
+LEGAL_RULE = re.compile(
+    r"\b(industrial disputes act|project sovereign|section \d+[a-z]*|statute|clause|contract|agreement|compliance)\b",
+    re.IGNORECASE
+)
+GREETING_RULE = re.compile(
+    r"^\s*(hi|hello|hey|yo|thanks|thank you|good (morning|afternoon|evening))\b[\s!.?]*$",
+    re.IGNORECASE
+)
+
+# ==============================================================================
+# 🧲 STAGE 2: EMBEDDING CENTROIDS (Milliseconds)
+# ==============================================================================
+# Labelled example queries. Each department's centroid is the mean of these vectors.
+ROUTE_EXAMPLES = {
+    "legal": [
+        "Who founded Project Sovereign?",
+        "What does the Industrial Disputes Act say about layoffs?",
+        "Summarise the termination clause in our contract",
+        "What is the notice period for retrenchment?",
+        "Find the document that mentions the agency's future plans",
+        "What are our obligations under the compliance policy?",
+    ],
+    "data": [
+        "Plot monthly revenue by region",
+        "Show me a bar chart of sales per product",
+        "Calculate the average order value from the file",
+        "Which customer has the highest total spend in the csv?",
+        "Analyze the uploaded dataset and find trends",
+        "Draw a line graph of profit over time",
+    ],
+    "general": [
+        "Hello, how are you?",
+        "Tell me a joke",
+        "What is the capital of France?",
+        "Write a short poem about the sea",
+        "Thanks for your help",
+        "Explain what machine learning is",
+    ],
+}
+
+_centroids = None
+_centroid_lock = threading.Lock()
+
+# 📈 Which stage decided each query (so we can measure LLM calls saved)
+ROUTE_STATS = {"rules": 0, "embedding": 0, "llm": 0}
+LAST_ROUTE = {"department": None, "path": None, "confidence": None}
+
+def _normalize(vector):
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+def _get_centroids():
+    """Embeds the labelled examples once per process and caches the centroids."""
+    global _centroids
+    if _centroids is None:
+        with _centroid_lock:
+            if _centroids is None:
+                embeddings = get_embeddings()
+                centroids = {}
+                for department, examples in ROUTE_EXAMPLES.items():
+                    vectors = [_normalize(v) for v in embeddings.embed_documents(examples)]
+                    mean = [sum(col) / len(vectors) for col in zip(*vectors)]
+                    centroids[department] = _normalize(mean)
+                _centroids = centroids
+    return _centroids
+
+def classify_by_rules(query):
+    """Returns a department for unambiguous keyword matches, else None."""
+    is_data = bool(DATA_RULE.search(query))
+    is_legal = bool(LEGAL_RULE.search(query))
+    if is_data and not is_legal:
+        return "data"
+    if is_legal and not is_data:
+        return "legal"
+    if GREETING_RULE.match(query):
+        return "general"
+    return None
+
+def classify_by_embedding(query):
+    """
+    Returns (department, confidence) from the nearest centroid.
+    Confidence is the similarity gap between the best and runner-up department.
+    """
+    centroids = _get_centroids()
+    query_vector = _normalize(embed_query(query))
+    scores = sorted(
+        ((sum(a * b for a, b in zip(query_vector, c)), dept) for dept, c in centroids.items()),
+        reverse=True
+    )
+    (best_score, best_dept), (second_score, _) = scores[0], scores[1]
+    return best_dept, best_score - second_score
+
+def _record(department, path, confidence):
+    ROUTE_STATS[path] += 1
+    LAST_ROUTE.update({"department": department, "path": path, "confidence": confidence})
+    print(f"🧭 Routed to '{department}' via {path} (confidence {confidence:.2f})")
+    return department
+
+def get_route_stats():
+    """Returns the per-stage counters plus the share of queries that skipped the LLM."""
+    total = sum(ROUTE_STATS.values())
+    saved = total - ROUTE_STATS["llm"]
+    return {**ROUTE_STATS, "total": total, "llm_calls_saved": saved,
+            "saved_ratio": (saved / total) if total else 0.0}
+
+def route_query(query, threshold=None):
     """
     Determines if the query is for the 'legal' (Knowledge Base), 'data' dept, or 'general' chat.
+    Tries keyword rules, then the embedding classifier, and only asks the LLM when both are unsure.
     """
-    model_name = f"ollama/{CURRENT_CONFIG['manager_model']}"
-    ollama_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
+    if threshold is None:
+        threshold = ROUTER_CONFIDENCE_THRESHOLD
+
+    # 1. Keyword rules
+    department = classify_by_rules(query)
+    if department:
+        return _record(department, "rules", 1.0)
+
+    # 2. Embedding centroids
+    try:
+        department, confidence = classify_by_embedding(query)
+        if confidence >= threshold:
+            return _record(department, "embedding", confidence)
+    except Exception as e:
+        print(f"Router Embedding Error: {e}")
+
+    # 3. Ambiguous -> ask the Manager
+    return _record(route_with_llm(query), "llm", 0.0)
+
+def route_with_llm(query):
+    """Asks the manager model to pick the department (slow path)."""
+    model_name = CURRENT_CONFIG['manager_model']
 
     # 🧠 SYSTEM PROMPT: The Routing Logic (UPDATED)
     system_prompt = """
     You are the Manager of an AI Agency. Route the user's query to the correct department.
-    
+
     DEPARTMENTS:
     1. 'legal': Use this for ANY question that requires looking up documents, laws, the "Industrial Disputes Act", OR information about "Project Sovereign" or the agency itself.
     2. 'data': ONLY for requests to "plot", "graph", "chart", "analyze csv", or "calculate" numbers from a file.
     3. 'general': For casual greetings like "hello", "hi", or questions unrelated to the business context.
-    
+
     CRITICAL RULES:
     - If the user asks "Who founded Project Sovereign?", route to 'legal' (so it checks the files).
     - If unsure, route to 'general'.
-    
+
     OUTPUT FORMAT:
     Return ONLY one word: 'legal', 'data', or 'general'. Do not add punctuation.
     """
-    
+
     try:
-        response = completion(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": query}
-            ],
-            api_base=ollama_url,
-            options={"num_gpu": 0}
-        )
-        
+        answer = llm.chat(model_name, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": query}
+        ])
+
         # Clean the output (remove spaces, punctuation)
-        decision = response['choices'][0]['message']['content'].strip().lower()
-        
+        decision = answer.strip().lower()
+
         # Fallback if the model gives a weird answer
         if "legal" in decision: return "legal"
         if "data" in decision: return "data"
@@ -47,4 +178,4 @@ def route_query(query):
 
     except Exception as e:
         print(f"Router Error: {e}")
-        return "general" # Safety net
\ No newline at end of file
+        return "general" # Safety net
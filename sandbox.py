@@ -0,0 +1,319 @@
+import os
+import uuid
+import tempfile
+import threading
+import multiprocessing
+import datasets
+from config import (
+    SANDBOX_WORKERS, SANDBOX_MAX_RUNS, SANDBOX_WALL_SECONDS, SANDBOX_WARM_SECONDS,
+    SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB, DUCKDB_MEMORY_MB
+)
+
+try:
+    import resource   # Not available on Windows: only the wall-clock limit applies there
+except ImportError:
+    resource = None
+
+# ==============================================================================
+# 🧪 SANDBOX: Prewarmed worker processes for LLM-generated analysis code
+# ==============================================================================
+# Keeps exec() out of the Streamlit server process: a runaway loop or a giant
+# allocation only takes down one worker, which is replaced.
+_ctx = multiprocessing.get_context("spawn")
+CHUNK_ROWS = 200_000   # Rows per chunk when streaming a CSV without an Arrow copy
+
+def _load_frame(job):
+    """Memory-maps the dataset's Arrow file (shared via the OS page cache); one copy per worker."""
+    arrow_path = job.get("arrow_path")
+    if arrow_path and os.path.exists(arrow_path):
+        import pyarrow.feather as feather
+        return feather.read_table(arrow_path, memory_map=True).to_pandas()
+    import pandas as pd
+    return pd.read_csv(job["csv_path"])
+
+def _duckdb_connection(job):
+    """An in-process DuckDB with the dataset as view `data`; scans stream and spill to disk."""
+    import duckdb
+    con = duckdb.connect()
+    con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_MB}MB'")
+    con.execute(f"SET temp_directory = '{os.path.join(tempfile.gettempdir(), 'duckdb_spill')}'")
+    arrow_path = job.get("arrow_path")
+    if arrow_path and os.path.exists(arrow_path):
+        import pyarrow.dataset as ds
+        con.register("data", ds.dataset(arrow_path, format="arrow"))
+    else:
+        csv_path = job["csv_path"].replace("'", "''")
+        con.execute(f"CREATE VIEW data AS SELECT * FROM read_csv_auto('{csv_path}')")
+    return con
+
+def _chunk_iterator(job):
+    """iter_chunks(columns=None): yields the dataset as a series of small pandas DataFrames."""
+    arrow_path = job.get("arrow_path")
+
+    def iter_chunks(columns=None):
+        if arrow_path and os.path.exists(arrow_path):
+            import pyarrow as pa
+            # Plain file reads, not mmap: a mapping counts against RLIMIT_AS, and
+            # this engine is for files bigger than that cap
+            with pa.OSFile(arrow_path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    yield (batch.select(columns) if columns else batch).to_pandas()
+        else:
+            import pandas as pd
+            yield from pd.read_csv(job["csv_path"], usecols=columns, chunksize=CHUNK_ROWS)
+
+    return iter_chunks
+
+def _data_globals(job, frames):
+    """
+    The names the generated code sees for its engine. The parsed DataFrame is
+    cached per worker, but every run gets its own copy (and its own DuckDB
+    connection), so code that mutates the data can't leak into later questions.
+    """
+    if job["engine"] == "duckdb":
+        return {"con": _duckdb_connection(job)}
+    if job["engine"] == "chunked":
+        return {"iter_chunks": _chunk_iterator(job)}
+    return {"df": _cached_frame(job, frames).copy()}
+
+def _cached_frame(job, frames):
+    """The worker's parsed copy of the dataset (only the latest one is kept)."""
+    if job["data_hash"] not in frames:
+        frames.clear()
+        frames[job["data_hash"]] = _load_frame(job)
+    return frames[job["data_hash"]]
+
+def _worker_main(conn, cpu_seconds, memory_mb):
+    """Entry point of a worker process: import the heavy stack once, then serve jobs."""
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    from io import StringIO
+    from contextlib import redirect_stdout
+    import pandas as pd
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    frames = {}
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        if resource is not None and cpu_seconds:
+            # RLIMIT_CPU counts the whole process lifetime, so move the bar for each run
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime)
+            resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, resource.RLIM_INFINITY))
+
+        if job.get("warm"):
+            # Load the active dataset ahead of the first question (outside any run's time limit)
+            try:
+                _cached_frame(job, frames)
+                conn.send({"ok": True, "error": None})
+            except Exception as e:
+                conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+            continue
+
+        result = {"ok": True, "stdout": "", "chart": None, "error": None}
+        output_buffer = StringIO()
+        data = {}
+        try:
+            data = _data_globals(job, frames) if job.get("data_hash") else {"df": None}
+            with redirect_stdout(output_buffer):
+                exec(job["code"], {"pd": pd, "plt": plt, "sns": sns, "CHART_PATH": job["chart_path"],
+                                   **data, **job.get("extra_globals", {})})
+        except BaseException as e:
+            result.update(ok=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            plt.close("all")
+            if "con" in data:
+                data["con"].close()
+
+        result["stdout"] = output_buffer.getvalue()
+        if os.path.exists(job["chart_path"]):
+            with open(job["chart_path"], "rb") as f:
+                result["chart"] = f.read()
+            os.remove(job["chart_path"])
+        conn.send(result)
+
+class _Worker:
+    def __init__(self, warm=None):
+        self.conn, child_conn = _ctx.Pipe()
+        self.process = _ctx.Process(
+            target=_worker_main,
+            args=(child_conn, SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB),
+            daemon=True,
+            name="sandbox-worker"
+        )
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+        self.warm_key = None
+        self.warming = False
+        if warm:
+            self.prepare(warm)
+
+    def prepare(self, warm):
+        """Asks the worker to load a dataset now; the reply is collected before its next run."""
+        key = (warm["engine"], warm["data_hash"])
+        if self.warm_key == key:
+            return
+        try:
+            self.conn.send({**warm, "warm": True})
+        except OSError:
+            return   # Already dead: replaced when it's next acquired
+        self.warm_key = key
+        self.warming = True
+
+    def wait_warm(self):
+        """Blocks until a pending warm-up finished; raises TimeoutError/EOFError/OSError on failure."""
+        if not self.warming:
+            return
+        if not self.conn.poll(SANDBOX_WARM_SECONDS):
+            raise TimeoutError(f"Loading the dataset took longer than {SANDBOX_WARM_SECONDS}s")
+        reply = self.conn.recv()
+        self.warming = False
+        if not reply["ok"]:
+            print(f"⚠️ Sandbox warm-up failed: {reply['error']}")
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=2)
+        self.conn.close()
+
+class SandboxPool:
+    """
+    A fixed number of prewarmed workers. Each run gets wall-clock, CPU and memory
+    limits; workers are recycled after SANDBOX_MAX_RUNS runs or any crash/timeout.
+    """
+
+    def __init__(self, size=SANDBOX_WORKERS):
+        self._warm = None
+        self._idle = [_Worker() for _ in range(size)]
+        self._available = threading.Condition()
+
+    def warm(self, spec):
+        """
+        Makes idle workers (and every worker started later) load this dataset
+        in the background. spec is None for nothing to preload.
+        """
+        with self._available:
+            self._warm = spec
+            if spec:
+                for worker in self._idle:
+                    worker.prepare(spec)
+
+    def _new_worker(self):
+        return _Worker(self._warm)
+
+    def _acquire(self):
+        with self._available:
+            while not self._idle:
+                self._available.wait()
+            worker = self._idle.pop()
+        if not worker.process.is_alive():
+            # Died while idle (OOM killer, signal...): swap in a fresh one
+            worker.kill()
+            worker = self._new_worker()
+        return worker
+
+    def _release(self, worker):
+        with self._available:
+            if self._warm:
+                worker.prepare(self._warm)
+            self._idle.append(worker)
+            self._available.notify()
+
+    def run(self, code, data_hash=None, arrow_path=None, csv_path=None, engine="memory", extra_globals=None):
+        """
+        Executes code against the dataset in a worker, using the given engine
+        ("memory", "duckdb" or "chunked", see datasets.choose_engine).
+        Returns {"ok", "stdout", "chart" (PNG bytes or None), "error"}.
+        """
+        chart_path = os.path.join(tempfile.gettempdir(), f"chart_{uuid.uuid4().hex}.png").replace("\\", "/")
+        job = {"code": code, "data_hash": data_hash, "arrow_path": arrow_path, "csv_path": csv_path,
+               "engine": engine, "chart_path": chart_path, "extra_globals": extra_globals or {}}
+
+        worker = self._acquire()
+        replacement = None
+        try:
+            try:
+                worker.wait_warm()   # Not counted against this run's wall-clock limit
+                worker.conn.send(job)
+                finished = worker.conn.poll(SANDBOX_WALL_SECONDS)
+                result = worker.conn.recv() if finished else None
+            except TimeoutError as e:
+                worker.kill()
+                replacement = self._new_worker()
+                return {"ok": False, "stdout": "", "chart": None, "error": str(e)}
+            except (EOFError, OSError):
+                # The worker died: CPU/memory limit hit or the code crashed the interpreter
+                worker.kill()
+                replacement = self._new_worker()
+                return {"ok": False, "stdout": "", "chart": None,
+                        "error": "Worker crashed (CPU or memory limit exceeded?)"}
+            if not finished:
+                worker.kill()
+                replacement = self._new_worker()
+                return {"ok": False, "stdout": "", "chart": None,
+                        "error": f"Timed out after {SANDBOX_WALL_SECONDS}s"}
+
+            worker.runs += 1
+            if worker.runs >= SANDBOX_MAX_RUNS:
+                worker.stop()
+                replacement = self._new_worker()
+            return result
+        finally:
+            if os.path.exists(chart_path):
+                os.remove(chart_path)
+            self._release(replacement or worker)
+
+_pool = {"instance": None}
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """The process-wide pool, started (and prewarmed) on first use."""
+    with _pool_lock:
+        if _pool["instance"] is None:
+            _pool["instance"] = SandboxPool()
+        return _pool["instance"]
+
+def _data_spec(dataset):
+    data_hash = dataset["hash"] if dataset else None
+    return {
+        "data_hash": data_hash,
+        "arrow_path": datasets.arrow_path(data_hash) if data_hash else None,
+        "csv_path": datasets.ACTIVE_CSV,
+        "engine": dataset.get("engine", "memory") if dataset else "memory",
+    }
+
+def warm(dataset):
+    """
+    Has the workers parse the active dataset now, so the first question doesn't
+    pay the Arrow -> pandas load. Only the in-memory engine has anything to preload.
+    """
+    spec = _data_spec(dataset) if dataset and dataset.get("engine", "memory") == "memory" else None
+    get_pool().warm(spec)
+
+def run(code, dataset):
+    """Runs data-agent code against a converted dataset (see datasets.get_active)."""
+    return get_pool().run(code, **_data_spec(dataset))
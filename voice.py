@@ -1,12 +1,197 @@
+import io
+import wave
+import queue
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import numpy as np
 import streamlit as st
 import whisper
-import os
-import tempfile
+from cache import LRUCache
+from config import (
+    WHISPER_MODEL, VOICE_QUEUE_SIZE, VOICE_THREADS,
+    TRANSCRIPT_CACHE_SIZE, VOICE_TIMEOUT_SECONDS,
+    VAD_THRESHOLD_DB, VAD_MIN_DB, VAD_MIN_SPEECH_MS, VAD_PAD_MS
+)
 
-# Load the model only once
-@st.cache_resource
-def load_whisper_model():
-    return whisper.load_model("base")
+SAMPLE_RATE = 16000               # What Whisper expects
+WINDOW_SAMPLES = 30 * SAMPLE_RATE # Whisper's fixed input window
+VAD_FRAME_MS = 30
+NO_SPEECH_THRESHOLD = 0.6         # Same cut-offs whisper.transcribe uses to drop silent windows
+LOGPROB_THRESHOLD = -1.0
+
+# ==============================================================================
+# 🎧 TRANSCRIPTION WORKER: One Whisper, shared by every session
+# ==============================================================================
+# st.audio_input hands back the same clip on every rerun, so results are
+# cached by content hash; new clips queue for a single worker thread.
+_transcripts = LRUCache(TRANSCRIPT_CACHE_SIZE)
+_pending = {}   # audio hash -> (future, stats) for clips Whisper hasn't finished yet
+_pending_lock = threading.Lock()
+_queue = queue.Queue(maxsize=VOICE_QUEUE_SIZE)
+_worker_lock = threading.Lock()
+_worker = {"thread": None}
+
+def _decode_windows(model, windows):
+    """Batch-decodes up-to-30s speech windows in one forward pass."""
+    import torch
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(w)), n_mels=model.dims.n_mels)
+        for w in windows
+    ]).to(model.device)
+    results = whisper.decode(model, mels, whisper.DecodingOptions(fp16=False, without_timestamps=True))
+    return " ".join(
+        r.text.strip() for r in results
+        if not (r.no_speech_prob > NO_SPEECH_THRESHOLD and r.avg_logprob < LOGPROB_THRESHOLD)
+    ).strip()
+
+def _worker_loop():
+    import torch
+    torch.set_num_threads(VOICE_THREADS)   # Leave the other cores to the rest of the app
+    model = whisper.load_model(WHISPER_MODEL)
+    while True:
+        windows, future = _queue.get()
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(_decode_windows(model, windows))
+        except Exception as e:
+            future.set_exception(e)
+
+def _ensure_worker():
+    with _worker_lock:
+        if _worker["thread"] is None or not _worker["thread"].is_alive():
+            _worker["thread"] = threading.Thread(target=_worker_loop, daemon=True, name="whisper-worker")
+            _worker["thread"].start()
+
+def submit(windows):
+    """Queues 16 kHz float32 speech windows for Whisper. Raises queue.Full when too many clips are waiting."""
+    _ensure_worker()
+    future = Future()
+    _queue.put_nowait((windows, future))
+    return future
+
+# ==============================================================================
+# 🔊 DECODING: Straight from the uploaded bytes, no temp files
+# ==============================================================================
+def _decode_wav(data):
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width != 2:
+        raise ValueError(f"Unsupported sample width: {width * 8} bit")
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        duration = len(audio) / rate
+        target = np.linspace(0, duration, int(duration * SAMPLE_RATE), endpoint=False)
+        audio = np.interp(target, np.arange(len(audio)) / rate, audio).astype(np.float32)
+    return audio
+
+def _decode_ffmpeg(data):
+    """Anything that isn't 16-bit PCM WAV: let ffmpeg convert it through a pipe."""
+    process = subprocess.run(
+        ["ffmpeg", "-nostdin", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+        input=data, capture_output=True, check=True
+    )
+    return np.frombuffer(process.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+def decode_audio(data):
+    """Recorded bytes -> mono 16 kHz float32 samples."""
+    try:
+        return _decode_wav(data)
+    except (wave.Error, ValueError, EOFError):
+        return _decode_ffmpeg(data)
+
+# ==============================================================================
+# 🗣️ VOICE ACTIVITY DETECTION: Only speech goes to Whisper
+# ==============================================================================
+def detect_speech(audio):
+    """
+    Energy-based VAD. Returns [(start, end)] sample ranges of speech, padded
+    by VAD_PAD_MS; an empty list means the clip is (near) silence.
+    """
+    frame = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    count = len(audio) // frame
+    if count == 0:
+        return []
+    frames = audio[:count * frame].reshape(count, frame)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    noise_floor = np.percentile(energy_db, 10)
+    voiced = energy_db > max(noise_floor + VAD_THRESHOLD_DB, VAD_MIN_DB)
+
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    padded = np.convolve(voiced, np.ones(2 * pad + 1), mode="same") > 0
+    edges = np.diff(np.concatenate(([0], padded.astype(np.int8), [0])))
+    min_frames = VAD_MIN_SPEECH_MS // VAD_FRAME_MS
+    segments = [
+        (int(start * frame), int(end * frame))
+        for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+        if voiced[start:end].sum() >= min_frames
+    ]
+    if not segments and 10 * np.log10(np.mean(audio ** 2) + 1e-10) > VAD_MIN_DB + VAD_THRESHOLD_DB:
+        # Loud but without quiet gaps to measure a noise floor against (speech over
+        # steady noise, or speech from start to end): let Whisper's no_speech_prob decide
+        segments = [(0, len(audio))]
+    return segments
+
+def speech_windows(audio, segments):
+    """Packs speech segments into as few <=30s windows as possible (long ones are split)."""
+    windows, current, length = [], [], 0
+    for start, end in segments:
+        for offset in range(start, end, WINDOW_SAMPLES):
+            piece = audio[offset:min(end, offset + WINDOW_SAMPLES)]
+            if current and length + len(piece) > WINDOW_SAMPLES:
+                windows.append(np.concatenate(current))
+                current, length = [], 0
+            current.append(piece)
+            length += len(piece)
+    if current:
+        windows.append(np.concatenate(current))
+    return windows
+
+def _on_transcribed(audio_hash, stats):
+    def done(future):
+        with _pending_lock:
+            _pending.pop(audio_hash, None)
+        if future.exception() is None:
+            _transcripts.put(audio_hash, {"text": future.result(), **stats})
+            print(f"🎙️ Whisper processed {stats['speech_seconds']:.1f}s of {stats['recorded_seconds']:.1f}s recorded")
+    return done
+
+def transcribe(data):
+    """
+    Returns {"text", "speech_seconds", "recorded_seconds"} for the recorded bytes,
+    reusing earlier results for the same clip. Clips without speech never reach Whisper.
+    A clip that is still queued or being decoded (e.g. after a timed-out rerun)
+    is waited on again instead of being submitted twice.
+    """
+    audio_hash = hashlib.sha256(data).hexdigest()
+    result = _transcripts.get(audio_hash)
+    if result is not None:
+        return result
+
+    submitted = None
+    with _pending_lock:
+        if audio_hash in _pending:
+            future, stats = _pending[audio_hash]
+        else:
+            audio = decode_audio(data)
+            segments = detect_speech(audio)
+            stats = {
+                "speech_seconds": sum(end - start for start, end in segments) / SAMPLE_RATE,
+                "recorded_seconds": len(audio) / SAMPLE_RATE,
+            }
+            if not segments:
+                return {"text": "", **stats}   # Not cached: the VAD is cheap to rerun
+            future = submitted = submit(speech_windows(audio, segments))
+            _pending[audio_hash] = (future, stats)
+    if submitted is not None:
+        # Outside the lock: the callback takes it, and runs right here if Whisper already finished
+        submitted.add_done_callback(_on_transcribed(audio_hash, stats))
+    return {"text": future.result(timeout=VOICE_TIMEOUT_SECONDS), **stats}
 
 def record_voice_widget():
     """
@@ -15,6 +200,13 @@ def record_voice_widget():
     audio_value = st.audio_input("Click the mic to record")
 
     if audio_value:
+        data = audio_value.getvalue()
+        audio_hash = hashlib.sha256(data).hexdigest()
+
+        # The widget keeps returning the same clip on every rerun: send it only once
+        if st.session_state.get("last_voice_hash") == audio_hash:
+            return None
+
         # 1. Create a placeholder for the status message
         status_box = st.empty()
         
@@ -22,19 +214,13 @@ def record_voice_widget():
         status_box.info("🎧 Transcribing... (Please wait)")
         
         try:
-            model = load_whisper_model()
-            
-            # Save raw audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
-                temp_audio.write(audio_value.read())
-                temp_audio_path = temp_audio.name
-            
-            # Transcribe
-            result = model.transcribe(temp_audio_path)
-            text = result["text"].strip()
-            
-            # Cleanup File
-            os.remove(temp_audio_path)
+            result = transcribe(data)
+            text = result["text"]
+
+            if result["speech_seconds"] == 0:
+                status_box.warning("⚠️ No speech detected.")
+                return None
+            st.session_state.last_voice_hash = audio_hash
             
             # --- 🛡️ HALLUCINATION FILTER ---
             hallucinations = [
@@ -53,10 +239,18 @@ def record_voice_widget():
 
             # 3. SUCCESS! Clear the "Transcribing" message immediately
             status_box.empty() 
+            st.caption(f"🎙️ Transcribed {result['speech_seconds']:.1f}s of speech "
+                       f"from {result['recorded_seconds']:.1f}s recorded")
             return text
-            
+
+        except FutureTimeout:
+            status_box.warning("⏳ Still transcribing this clip, it will be picked up on your next action.")
+            return None
+        except queue.Full:
+            status_box.warning("⏳ Voice transcription is busy, please try again in a moment.")
+            return None
         except Exception as e:
             status_box.error(f"Error: {e}")
             return None
             
-    return None
\ No newline at end of file
+    return None